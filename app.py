@@ -1,356 +1,186 @@
 # app.py
 import streamlit as st
-import sqlite3
-import pandas as pd
 import datetime
-import qrcode
-from io import BytesIO
-from PIL import Image
-import matplotlib.pyplot as plt
-from collections import defaultdict
-import hashlib
-import csv
+import functools
 import os
+from kasir import laporan, perf
+from kasir.cart import Cart
+from kasir.service import (
+    LINK_OVO,
+    LINK_GOPAY,
+    LINK_DANA,
+    LINK_QRIS,
+    OUTLETS,
+    ROLES,
+    add_product_db,
+    add_user_db,
+    archive_transactions,
+    attempt_login,
+    checkout,
+    compact_stock_ledger,
+    delete_product_db,
+    delete_user_db,
+    discard_export,
+    end_session,
+    export_laporan,
+    fetch_daily_comparison,
+    fetch_db_size,
+    fetch_data_version,
+    fetch_hourly_heatmap,
+    fetch_konsolidasi,
+    fetch_months,
+    fetch_product_sales,
+    fetch_products,
+    fetch_sales_by_method,
+    fetch_stock_at,
+    fetch_stock_drift,
+    fetch_stock_forecast,
+    fetch_stock_movements,
+    fetch_summary,
+    fetch_transactions_page,
+    fetch_users,
+    generate_qr_bytes,
+    get_catalog,
+    get_demand_model,
+    get_journal,
+    get_journal_sync,
+    get_pool,
+    get_qr_cache,
+    get_writer,
+    init_db,
+    rebuild_rollups,
+    resume_session,
+    run_maintenance,
+    safe_process_transaction,
+    set_password_db,
+    set_role_db,
+    start_session,
+    update_stock_db,
+    use_outlet,
+)
 
 # ----------------------------
 # CONFIG & CONSTANTS
 # ----------------------------
-DB_PATH = "kasir_seblak.db"
-
-# Ganti link berikut dengan link/ID pembayaran resmi merchantmu
-LINK_OVO   = "https://contoh-link-ovo.com/pay"
-LINK_GOPAY = "https://contoh-link-gopay.com/pay"
-LINK_DANA  = "https://contoh-link-dana.com/pay"
-LINK_QRIS  = "https://contoh-link-qris.com/pay"
-
+# link pembayaran (LINK_OVO, dst.) diatur di kasir/service.py
 st.set_page_config(page_title="Sistem Kasir Seblak", page_icon="🍜", layout="wide")
 
 # ----------------------------
-# HELPERS: DB, QR, AUTH
-# ----------------------------
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    """Buat database & tabel bila belum ada, plus sample data & users."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # products table
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS produk (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nama TEXT UNIQUE,
-        tipe TEXT,
-        harga INTEGER,
-        stok INTEGER
-    )
-    """)
-    # transaksi table
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS transaksi (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        waktu TEXT,
-        menu TEXT,
-        toppings TEXT,
-        jumlah INTEGER,
-        metode_pembayaran TEXT,
-        total_harga INTEGER
-    )
-    """)
-    # users table (simple)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        username TEXT PRIMARY KEY,
-        password_hash TEXT,
-        role TEXT
-    )
-    """)
-    conn.commit()
-
-    # insert sample products bila tabel kosong
-    cur.execute("SELECT COUNT(*) as c FROM produk")
-    if cur.fetchone()["c"] == 0:
-        sample = [
-            ("Seblak Original","menu",15000,50),
-            ("Seblak Kerupuk","menu",12000,40),
-            ("Seblak Ceker","menu",18000,30),
-            ("Seblak Makaroni","menu",16000,35),
-            ("Kerupuk","topping",3000,100),
-            ("Ceker","topping",5000,50),
-            ("Makaroni","topping",4000,60),
-            ("Sosis","topping",5000,40),
-            ("Telur","topping",4000,30),
-        ]
-        cur.executemany("INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)", sample)
-        conn.commit()
-
-    # insert default users bila kosong (username: admin / kasir, password: admin123 / kasir123)
-    cur.execute("SELECT COUNT(*) as c FROM users")
-    if cur.fetchone()["c"] == 0:
-        users = [
-            ("admin", hash_pwd("admin123"), "admin"),
-            ("kasir", hash_pwd("kasir123"), "kasir")
-        ]
-        cur.executemany("INSERT INTO users (username, password_hash, role) VALUES (?,?,?)", users)
-        conn.commit()
-
-    conn.close()
-
-def hash_pwd(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
-
-def verify_pwd(password: str, pwd_hash: str) -> bool:
-    return hash_pwd(password) == pwd_hash
-
-def generate_qr_bytes(data: str):
-    qr = qrcode.QRCode(box_size=8, border=2)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return buf
-
-# ----------------------------
-# DB OPERATIONS
+# UI CACHE
 # ----------------------------
-def fetch_products():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM produk ORDER BY tipe, nama")
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
-
-def get_product_by_name(nama):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM produk WHERE nama = ?", (nama,))
-    row = cur.fetchone()
-    conn.close()
-    return dict(row) if row else None
-
-def add_product_db(nama, tipe, harga, stok):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)", (nama, tipe, harga, stok))
-        conn.commit()
-        return True, None
-    except sqlite3.IntegrityError as e:
-        return False, str(e)
-    finally:
-        conn.close()
-
-def update_stock_db(nama, delta):
-    """delta negatif untuk mengurangi, positif untuk tambah"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT stok FROM produk WHERE nama = ?", (nama,))
-    r = cur.fetchone()
-    if not r:
-        conn.close()
-        return False, "Produk tidak ditemukan"
-    new_stok = r["stok"] + delta
-    if new_stok < 0:
-        conn.close()
-        return False, "Stok tidak cukup"
-    cur.execute("UPDATE produk SET stok = ? WHERE nama = ?", (new_stok, nama))
-    conn.commit()
-    conn.close()
-    return True, None
-
-def delete_product_db(nama):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM produk WHERE nama = ?", (nama,))
-    conn.commit()
-    conn.close()
-    return True
-
-def record_transaction_db(waktu, menu, toppings, jumlah, metode_pembayaran, total_harga):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    toppings_str = ",".join(toppings)
-    cur.execute("""
-        INSERT INTO transaksi (waktu, menu, toppings, jumlah, metode_pembayaran, total_harga)
-        VALUES (?,?,?,?,?,?)
-    """, (waktu, menu, toppings_str, jumlah, metode_pembayaran, total_harga))
-    conn.commit()
-    conn.close()
-
-def fetch_transactions(month_prefix=None):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    if month_prefix:
-        cur.execute("SELECT * FROM transaksi WHERE waktu LIKE ? ORDER BY waktu DESC", (f"{month_prefix}%",))
-    else:
-        cur.execute("SELECT * FROM transaksi ORDER BY waktu DESC")
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
-
-def fetch_users():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT username, role FROM users")
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
-
-# ----------------------------
-# BUSINESS LOGIC
-# ----------------------------
-def safe_process_transaction(menu, toppings, jumlah, metode_pembayaran, total_harga):
-    """
-    Lakukan cek stok dulu semua, jika semua cukup -> lakukan pengurangan stok dalam satu transaksi DB.
-    Jika ada yang kurang, kembalikan False tanpa mengubah DB.
-    """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        # cek stok menu
-        cur.execute("SELECT stok FROM produk WHERE nama = ?", (menu,))
-        r = cur.fetchone()
-        if not r:
-            return False, f"Menu {menu} tidak ditemukan."
-        if r["stok"] < jumlah:
-            return False, f"Stok {menu} tidak mencukupi."
-
-        # cek topping
-        for t in toppings:
-            cur.execute("SELECT stok FROM produk WHERE nama = ?", (t,))
-            rr = cur.fetchone()
-            if not rr:
-                return False, f"Topping {t} tidak ditemukan."
-            if rr["stok"] < jumlah:
-                return False, f"Stok {t} tidak mencukupi."
-
-        # semua cukup -> mulai transaksi (manual)
-        waktu = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        # kurangi stok menu
-        cur.execute("UPDATE produk SET stok = stok - ? WHERE nama = ?", (jumlah, menu))
-        # kurangi stok topping
-        for t in toppings:
-            cur.execute("UPDATE produk SET stok = stok - ? WHERE nama = ?", (jumlah, t))
-        # catat transaksi
-        toppings_str = ",".join(toppings)
-        cur.execute("""
-            INSERT INTO transaksi (waktu, menu, toppings, jumlah, metode_pembayaran, total_harga)
-            VALUES (?,?,?,?,?,?)
-        """, (waktu, menu, toppings_str, jumlah, metode_pembayaran, total_harga))
-        conn.commit()
-        return True, waktu
-    except Exception as e:
-        conn.rollback()
-        return False, str(e)
-    finally:
-        conn.close()
-
-# ----------------------------
-# AUTH
-# ----------------------------
-def attempt_login(username, password):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT password_hash, role FROM users WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        return False, "User tidak ditemukan"
-    if verify_pwd(password, row["password_hash"]):
-        return True, row["role"]
-    return False, "Password salah"
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_product_sales(outlet, version, start=None):
+    """Agregasi produk terlaris per outlet, dihitung ulang hanya bila ``version`` berubah (ada penjualan baru)."""
+    use_outlet(outlet)
+    return fetch_product_sales(start)
 
 # ----------------------------
 # INIT
 # ----------------------------
 if "initialized" not in st.session_state:
-    # ensure DB and sample data exist
-    if not os.path.exists(DB_PATH):
-        # create DB file
-        open(DB_PATH, "w").close()
+    # ensure DB and sample data exist (satu file per outlet); init_db hanya bekerja sekali per proses
+    for db_path in OUTLETS.values():
+        if not os.path.exists(db_path):
+            # create DB file
+            open(db_path, "w").close()
     init_db()
+    # snapshot stok / arsip harian; dicek paling sering sekali per jam per proses
+    run_maintenance()
     st.session_state["initialized"] = True
 
 # ----------------------------
 # LOGIN UI
 # ----------------------------
 st.title("🍜 Sistem Kasir Seblak")
-if "user" not in st.session_state:
-    st.session_state.user = None
-    st.session_state.role = None
+# token sesi bertanda tangan disimpan di session_state (bukan URL: tidak masuk riwayat browser,
+# link yang disalin atau share layar). Rerun/reconnect tidak memeriksa password lagi; menutup
+# tab = logout. Token tetap dicek tiap rerun, jadi gugur bila password/role diubah admin.
+if "sesi" in st.query_params:
+    del st.query_params["sesi"]  # token lama yang sempat tersimpan di URL
+sesi = resume_session(st.session_state.get("sesi_token"))
+st.session_state.user, st.session_state.role, st.session_state.outlet = sesi if sesi else (None, None, None)
 
 with st.sidebar:
     st.header("Akun")
     if st.session_state.user is None:
         username = st.text_input("Username", key="login_user")
         password = st.text_input("Password", key="login_pwd", type="password")
+        outlet = next(iter(OUTLETS))
+        if len(OUTLETS) > 1:
+            outlet = st.selectbox("Outlet", list(OUTLETS), key="login_outlet")
         if st.button("Login"):
-            ok, info = attempt_login(username.strip(), password)
+            ok, info = attempt_login(username.strip(), password, outlet)
             if ok:
-                st.session_state.user = username.strip()
-                st.session_state.role = info
-                st.success(f"Login berhasil sebagai {st.session_state.user} ({st.session_state.role})")
-                st.experimental_rerun()
+                st.session_state.sesi_token = start_session(username.strip(), info, outlet)
+                st.rerun()
             else:
                 st.error(info)
-        st.info("Default: admin/admin123 atau kasir/kasir123 (ubah di DB saat deploy)")
+        st.info("Default: admin/admin123 atau kasir/kasir123 (ganti di Pengaturan saat deploy)")
     else:
         st.write(f"**{st.session_state.user}** ({st.session_state.role})")
+        if len(OUTLETS) > 1:
+            st.write(f"Outlet: **{st.session_state.outlet}**")
         if st.button("Logout"):
-            st.session_state.user = None
-            st.session_state.role = None
-            st.experimental_rerun()
+            end_session(st.session_state.pop("sesi_token", None))
+            st.rerun()
 
 # require login
 if st.session_state.user is None:
     st.warning("Silakan login terlebih dahulu (sidebar).")
     st.stop()
 
-# ----------------------------
-# MAIN TABS
-# ----------------------------
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Kasir", "Stok", "Laporan Penjualan", "Statistik", "Pengaturan"])
+# semua helper DB di sesi ini memakai database outlet tempat user login
+use_outlet(st.session_state.outlet)
+
+
+def outlet_sesi(fn):
+    """Rerun fragment tidak menjalankan bagian atas skrip, jadi tiap halaman memasang outlet sesinya sendiri."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        use_outlet(st.session_state.outlet)
+        return fn(*args, **kwargs)
+    return wrapper
 
 # ----------------------------
-# TAB 1: KASIR
+# HALAMAN 1: KASIR
+# Tiap halaman adalah fragment: hanya halaman yang dipilih (menu NAVIGASI di
+# bawah) yang dijalankan, dan interaksi di dalamnya hanya me-rerun halaman itu.
 # ----------------------------
-with tab1:
+@st.fragment
+@outlet_sesi
+@perf.run("kasir")
+def halaman_kasir():
     st.header("Transaksi Kasir")
-    produk_list = fetch_products()
-    menu_options = [p["nama"] for p in produk_list if p["tipe"] == "menu"]
-    topping_options = [p["nama"] for p in produk_list if p["tipe"] == "topping"]
+    katalog = get_catalog().snapshot()
+    menu_options = katalog.names("menu")
+    topping_options = katalog.names("topping")
 
     if not menu_options:
-        st.info("Tidak ada menu. Tambah produk di tab Pengaturan.")
+        st.info("Tidak ada menu. Tambah produk di menu Pengaturan.")
     else:
         selected_menu = st.selectbox("Pilih Menu Seblak", menu_options)
         if selected_menu:
-            prod = get_product_by_name(selected_menu)
+            prod = katalog.get(selected_menu)
             st.write(f"Harga: Rp {prod['harga']:,} | Stok: {prod['stok']}")
 
         selected_toppings = st.multiselect("Pilih Topping", topping_options)
         if selected_toppings:
             st.write("Harga Topping:")
             for t in selected_toppings:
-                p = get_product_by_name(t)
+                p = katalog.get(t)
                 st.write(f"- {t}: Rp {p['harga']:,} | Stok: {p['stok']}")
 
         jumlah = st.number_input("Jumlah", min_value=1, max_value=100, value=1)
 
         # Hitung total (cek produk ada)
         if selected_menu:
-            harga_menu = get_product_by_name(selected_menu)["harga"]
-            harga_toppings = sum([get_product_by_name(t)["harga"] for t in selected_toppings]) if selected_toppings else 0
+            harga_menu = katalog.get(selected_menu)["harga"]
+            harga_toppings = sum(katalog.get(t)["harga"] for t in selected_toppings)
             total_harga = (harga_menu + harga_toppings) * jumlah
             st.subheader(f"Total Harga: Rp {total_harga:,}")
 
         metode_pembayaran = st.radio("Metode Pembayaran",
-            ["Tunai", "E-Wallet (OVO)", "E-Wallet (Gopay)", "E-Wallet (Dana)", "QRIS"]
+            laporan.METODE_PEMBAYARAN
         )
 
         # Tampilkan QR jika e-wallet
@@ -374,38 +204,108 @@ with tab1:
             else:
                 ok, info = safe_process_transaction(selected_menu, selected_toppings, jumlah, metode_pembayaran, total_harga)
                 if ok:
-                    st.success("Transaksi berhasil diproses!")
+                    pesanan_id, waktu = info
+                    if pesanan_id is None:
+                        st.warning(f"Database sedang sibuk: transaksi (Rp {total_harga:,}) disimpan di jurnal "
+                                   f"offline dan akan disinkronkan otomatis. — {waktu}")
+                    else:
+                        st.success("Transaksi berhasil diproses!")
                     st.subheader("Struk Pembayaran")
                     st.write(f"Menu: {selected_menu}")
                     st.write(f"Topping: {', '.join(selected_toppings) if selected_toppings else 'Tidak ada'}")
                     st.write(f"Jumlah: {jumlah}")
                     st.write(f"Total: Rp {total_harga:,}")
                     st.write(f"Metode Pembayaran: {metode_pembayaran}")
-                    st.write(f"Waktu: {info}")  # waktu dikembalikan
+                    st.write(f"Waktu: {waktu}")
                     if qr_link:
                         st.image(generate_qr_bytes(qr_link), width=200)
                 else:
                     st.error(f"Transaksi gagal: {info}")
 
+        # ---- Keranjang: beberapa menu sekaligus dalam satu pesanan ----
+        if "cart" not in st.session_state:
+            st.session_state.cart = Cart()
+        cart = st.session_state.cart
+
+        if "cart_hasil" in st.session_state:
+            jenis, pesan, link = st.session_state.pop("cart_hasil")
+            if jenis == "warning":
+                st.warning(pesan)
+            else:
+                st.success(pesan)
+            if link:
+                st.image(generate_qr_bytes(link), width=200)
+
+        if st.button("Tambah ke Keranjang") and selected_menu:
+            cart.add(selected_menu, selected_toppings, jumlah, total_harga)
+
+        if cart.lines:
+            st.subheader("Keranjang")
+            for i, line in enumerate(cart.lines):
+                col1, col2 = st.columns([5,1])
+                with col1:
+                    topping_txt = ", ".join(line.toppings) if line.toppings else "Tidak ada"
+                    st.write(f"{line.jumlah}x {line.menu} (Topping: {topping_txt}) — Rp {line.total_harga:,}")
+                with col2:
+                    if st.button("Hapus", key=f"cart_del_{i}"):
+                        cart.remove(i)
+                        st.rerun(scope="fragment")
+            st.subheader(f"Total Keranjang: Rp {cart.total_harga:,}")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Checkout Keranjang"):
+                    ok, info = checkout(cart, metode_pembayaran)
+                    if ok:
+                        pesanan_id, waktu = info
+                        if pesanan_id is None:
+                            hasil = ("warning", f"Database sedang sibuk: pesanan ({len(cart)} baris, Rp {cart.total_harga:,}) "
+                                                f"disimpan di jurnal offline dan akan disinkronkan otomatis. — {waktu}")
+                        else:
+                            hasil = ("success", f"Pesanan #{pesanan_id} berhasil diproses! ({len(cart)} baris, Rp {cart.total_harga:,}) — {waktu}")
+                        # pesan & QR ditampilkan sesudah rerun, supaya daftar keranjang lama tidak tertinggal di layar
+                        st.session_state.cart_hasil = (*hasil, qr_link)
+                        cart.clear()
+                        st.rerun(scope="fragment")
+                    else:
+                        st.error(f"Checkout gagal: {info}")
+            with col2:
+                if st.button("Kosongkan Keranjang"):
+                    cart.clear()
+                    st.rerun(scope="fragment")
+
 # ----------------------------
-# TAB 2: STOK
+# HALAMAN 2: STOK
 # ----------------------------
-with tab2:
+@st.fragment
+@outlet_sesi
+@perf.run("stok")
+def halaman_stok():
     st.header("Manajemen Stok")
-    produk_df = pd.DataFrame(fetch_products())
+    import pandas as pd  # lazy: hanya di tab yang memakai DataFrame
+    produk_list = fetch_products()
+    produk_names = [p["nama"] for p in produk_list]
+    with perf.timer("dataframe.stok"):
+        produk_df = pd.DataFrame(produk_list)
     if produk_df.empty:
         st.info("Belum ada produk.")
     else:
-        produk_df_display = produk_df.copy()
-        produk_df_display["Status"] = produk_df_display["stok"].apply(lambda s: "Hampir Habis" if s < 10 else ("Cukup" if s < 20 else "Banyak"))
-        st.dataframe(produk_df_display[["nama","tipe","harga","stok","Status"]].rename(columns={
-            "nama":"Nama","tipe":"Tipe","harga":"Harga","stok":"Stok"
+        # status dari prakiraan permintaan (bukan ambang stok tetap); lihat kasir/forecast.py
+        prakiraan = pd.DataFrame(fetch_stock_forecast())
+        produk_df_display = produk_df.merge(
+            prakiraan[["nama","per_hari","habis_dalam","tanggal_habis","pesan","status"]], on="nama", how="left"
+        )
+        st.dataframe(produk_df_display[["nama","tipe","harga","stok","per_hari","tanggal_habis","pesan","status"]].rename(columns={
+            "nama":"Nama","tipe":"Tipe","harga":"Harga","stok":"Stok","per_hari":"Prakiraan/Hari",
+            "tanggal_habis":"Perkiraan Habis","pesan":"Saran Restock","status":"Status"
         }), use_container_width=True)
+        restock = produk_df_display[produk_df_display["pesan"] > 0].sort_values("habis_dalam", na_position="last")
+        if not restock.empty:
+            st.caption("Perlu restock: " + ", ".join(f"{r.nama} +{int(r.pesan)}" for r in restock.itertuples()))
 
     st.subheader("Tambah / Update Stok")
     col1, col2, col3 = st.columns([2,1,1])
     with col1:
-        produk_pilih = st.selectbox("Pilih Produk", [p["nama"] for p in fetch_products()])
+        produk_pilih = st.selectbox("Pilih Produk", produk_names)
     with col2:
         jumlah_tambah = st.number_input("Jumlah yang Ditambahkan", min_value=1, max_value=1000, value=1)
     with col3:
@@ -419,89 +319,239 @@ with tab2:
     st.subheader("Kurangi Stok (misal koreksi)")
     col1, col2, col3 = st.columns([2,1,1])
     with col1:
-        produk_kurang = st.selectbox("Pilih Produk (kurangi)", [p["nama"] for p in fetch_products()], key="kurang_sel")
+        produk_kurang = st.selectbox("Pilih Produk (kurangi)", produk_names, key="kurang_sel")
     with col2:
         jumlah_kurang = st.number_input("Jumlah yang Dikurangi", min_value=1, max_value=1000, value=1, key="kurang_num")
     with col3:
-        if st.button("Kurangi Stok"):
-            ok, msg = update_stock_db(produk_kurang, -jumlah_kurang)
-            if ok:
-                st.success(f"Stok {produk_kurang} berhasil dikurangi.")
-            else:
-                st.error(msg)
+        catatan_kurang = st.text_input("Keterangan", placeholder="rusak, hilang, salah hitung…", key="kurang_ket")
+    if st.button("Kurangi Stok"):
+        ok, msg = update_stock_db(produk_kurang, -jumlah_kurang, "correction", catatan_kurang.strip() or None)
+        if ok:
+            st.success(f"Stok {produk_kurang} berhasil dikurangi.")
+        else:
+            st.error(msg)
+
+    # riwayat dari ledger stok_movement (penjualan, restock, koreksi)
+    st.subheader("Riwayat Stok")
+    produk_by_nama = {p["nama"]: p for p in produk_list}
+    col1, col2, col3 = st.columns([2,1,1])
+    with col1:
+        produk_riwayat = st.selectbox("Pilih Produk (riwayat)", produk_names, key="riwayat_sel")
+    with col2:
+        tgl_riwayat = st.date_input("Stok pada tanggal", datetime.date.today(), key="riwayat_tgl")
+    with col3:
+        jam_riwayat = st.time_input("Jam", datetime.time(23, 59), key="riwayat_jam")
+    if produk_riwayat:
+        pid = produk_by_nama[produk_riwayat]["id"]
+        waktu_riwayat = datetime.datetime.combine(tgl_riwayat, jam_riwayat).strftime("%Y-%m-%d %H:%M:59")
+        stok_lampau = fetch_stock_at(pid, waktu_riwayat)
+        if stok_lampau is None:
+            st.info(f"Belum ada catatan stok {produk_riwayat} sebelum {waktu_riwayat}.")
+        else:
+            st.metric(f"Stok {produk_riwayat} pada {waktu_riwayat}", stok_lampau)
+        mutasi = fetch_stock_movements(pid, limit=50)
+        if mutasi:
+            st.caption("50 mutasi terakhir")
+            st.dataframe(pd.DataFrame(mutasi).rename(columns={
+                "waktu":"Waktu","delta":"Perubahan","alasan":"Alasan","ref_id":"Pesanan","catatan":"Keterangan"
+            }).drop(columns=["id"]), use_container_width=True, hide_index=True)
 
 # ----------------------------
-# TAB 3: LAPORAN PENJUALAN
+# HALAMAN 3: LAPORAN PENJUALAN
 # ----------------------------
-with tab3:
+def _export_terkirim():
+    # isi file sudah ada di memori Streamlit saat tombol dirender, jadi file di disk boleh dihapus
+    siap = st.session_state.get("lap_export")
+    if siap:
+        discard_export(siap[3])
+        st.session_state.lap_export = None
+
+
+@st.fragment
+@outlet_sesi
+@perf.run("laporan")
+def halaman_laporan():
     st.header("Laporan Penjualan")
-    # kumpulkan semua transaksi
-    semua_trx = fetch_transactions()
-    if not semua_trx:
+    import pandas as pd
+    # daftar bulan unik (YYYY-MM) langsung dari index, tanpa memuat semua transaksi
+    semua_bulan = fetch_months()
+    if not semua_bulan:
         st.info("Belum ada transaksi.")
     else:
-        # Buat daftar bulan unik: YYYY-MM
-        semua_bulan = sorted(list({t["waktu"][:7] for t in semua_trx}), reverse=True)
-        pilihan_bulan = st.selectbox("Pilih Bulan", ["Semua"] + semua_bulan)
-        if pilihan_bulan == "Semua":
-            df = pd.DataFrame(semua_trx)
-        else:
-            df = pd.DataFrame(fetch_transactions(pilihan_bulan))
-
-        if not df.empty:
-            # perbaikan tampilan toppings
-            if "toppings" in df.columns:
-                df["toppings"] = df["toppings"].fillna("").apply(lambda s: s if s else "Tidak ada")
-            st.dataframe(df, use_container_width=True)
-
-            # Metrics
-            total_terjual = int(df["jumlah"].sum())
-            total_pendapatan = int(df["total_harga"].sum())
+        col1, col2 = st.columns(2)
+        with col1:
+            jenis_periode = st.selectbox("Periode", ["Bulan", "Minggu", "Hari"], key="lap_jenis")
+        with col2:
+            if jenis_periode == "Bulan":
+                pilihan_bulan = st.selectbox("Pilih Bulan", ["Semua"] + semua_bulan)
+                start, end = (None, None) if pilihan_bulan == "Semua" else laporan.month_bounds(pilihan_bulan)
+                label_periode = pilihan_bulan if pilihan_bulan != "Semua" else "all"
+            else:
+                tanggal = st.date_input("Pilih Tanggal", datetime.date.today(), key="lap_tanggal")
+                start, end = laporan.period_bounds(jenis_periode.lower(), tanggal)
+                label_periode = f"{jenis_periode.lower()}_{tanggal}"
+
+        # laporan gabungan untuk pemilik: rollup tiap outlet di-query paralel lalu dijumlahkan
+        if st.session_state.role == "admin" and len(OUTLETS) > 1 and st.toggle("Gabungan semua outlet", key="lap_gabungan"):
+            gabungan = fetch_konsolidasi(start, end)
+            for kode, pesan in gabungan["gagal"].items():
+                st.error(f"Outlet {kode} tidak bisa dibaca: {pesan}")
+            total = gabungan["ringkasan"]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Transaksi (Semua Outlet)", f"{total['jumlah_transaksi']:,}")
+            with col2:
+                st.metric("Terjual (Semua Outlet)", f"{total['total_terjual']} porsi")
+            with col3:
+                st.metric("Pendapatan (Semua Outlet)", f"Rp {total['total_pendapatan']:,}")
+            st.subheader("Per Outlet")
+            st.dataframe(pd.DataFrame(gabungan["per_outlet"]), use_container_width=True, hide_index=True)
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("Total Terjual", f"{total_terjual} porsi")
+                st.subheader("Per Metode Pembayaran")
+                st.dataframe(pd.DataFrame(gabungan["metode"]), use_container_width=True, hide_index=True)
             with col2:
-                st.metric("Total Pendapatan", f"Rp {total_pendapatan:,}")
-
-            # Export CSV
-            csv_bytes = df.to_csv(index=False).encode("utf-8")
-            st.download_button("Download CSV Laporan", csv_bytes, file_name=f"laporan_{pilihan_bulan if pilihan_bulan!='Semua' else 'all'}.csv", mime="text/csv")
+                st.subheader("Produk Terlaris")
+                st.dataframe(pd.DataFrame(gabungan["produk"]), use_container_width=True, hide_index=True)
+            st.divider()
+            st.caption(f"Rincian outlet {st.session_state.outlet}")
+
+        # angka-angka laporan: beberapa query agregat kecil (rollup), tanpa memuat baris transaksi
+        ringkasan = fetch_summary(start, end)
+        if ringkasan["jumlah_transaksi"]:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Jumlah Transaksi", f"{ringkasan['jumlah_transaksi']:,}")
+            with col2:
+                st.metric("Total Terjual", f"{ringkasan['total_terjual']} porsi")
+            with col3:
+                st.metric("Total Pendapatan", f"Rp {ringkasan['total_pendapatan']:,}")
+
+            st.subheader("Per Metode Pembayaran")
+            with perf.timer("dataframe.laporan_metode"):
+                df_metode = pd.DataFrame(fetch_sales_by_method(start, end))
+            st.dataframe(df_metode, use_container_width=True, hide_index=True)
+
+            import altair as alt  # lazy, seperti pandas
+            st.subheader("Penjualan per Jam")
+            heatmap = fetch_hourly_heatmap(start, end)
+            with perf.timer("chart.laporan_heatmap"):
+                chart = alt.Chart(pd.DataFrame(heatmap)).mark_rect().encode(
+                    x=alt.X("Jam:O", title="Jam"),
+                    y=alt.Y("Hari:N", sort=laporan.HARI, title=None),
+                    color=alt.Color("Transaksi:Q", scale=alt.Scale(scheme="oranges")),
+                    tooltip=["Hari", "Jam", "Transaksi", "Pendapatan"],
+                )
+                st.altair_chart(chart, use_container_width=True)
+
+            st.subheader("Perbandingan Harian")
+            harian = fetch_daily_comparison(start, end)
+            if jenis_periode == "Hari" and harian:
+                hari_ini = harian[0]
+                st.metric("Pendapatan vs Kemarin", f"Rp {hari_ini['Pendapatan']:,}",
+                          delta=f"Rp {hari_ini['Selisih']:,}")
+            else:
+                st.dataframe(pd.DataFrame(harian), use_container_width=True, hide_index=True)
+
+            # rincian per baris hanya dimuat bila diminta, per halaman (keyset cursor)
+            if st.toggle("Tampilkan rincian transaksi", key="lap_rincian"):
+                # reset ke halaman 1 bila periode berganti
+                if st.session_state.get("lap_periode") != (start, end):
+                    st.session_state.lap_periode = (start, end)
+                    st.session_state.lap_cursors = [None]
+                cursors = st.session_state.lap_cursors
+                rows, next_cursor = fetch_transactions_page(start, end, cursors[-1])
+                with perf.timer("dataframe.laporan"):
+                    df = pd.DataFrame(rows)
+                    # perbaikan tampilan toppings
+                    if "toppings" in df.columns:
+                        df["toppings"] = df["toppings"].fillna("").apply(lambda s: s if s else "Tidak ada")
+                st.dataframe(df, use_container_width=True)
+
+                col1, col2, col3 = st.columns([1,2,1])
+                with col1:
+                    if len(cursors) > 1 and st.button("« Sebelumnya"):
+                        cursors.pop()
+                        st.rerun(scope="fragment")
+                with col2:
+                    st.caption(f"Halaman {len(cursors)} — {ringkasan['jumlah_transaksi']} transaksi")
+                with col3:
+                    if next_cursor is not None and st.button("Berikutnya »"):
+                        cursors.append(next_cursor)
+                        st.rerun(scope="fragment")
+
+            # Export: file baru dibuat saat diminta, ditulis streaming ke disk (bukan DataFrame di memori)
+            col1, col2 = st.columns([1,2])
+            with col1:
+                fmt = st.radio("Format", ["csv", "parquet"], horizontal=True, key="lap_fmt")
+            with col2:
+                if st.button("Siapkan File Laporan"):
+                    lama = st.session_state.get("lap_export")
+                    if lama:
+                        discard_export(lama[3])
+                    try:
+                        st.session_state.lap_export = (start, end, fmt, export_laporan(start, end, fmt))
+                    except RuntimeError as e:
+                        st.session_state.lap_export = None
+                        st.error(str(e))
+                siap = st.session_state.get("lap_export")
+                if siap and siap[:3] == (start, end, fmt) and os.path.exists(siap[3]):
+                    mime = "text/csv" if fmt == "csv" else "application/vnd.apache.parquet"
+                    # download_button menyalin isi file ke memori server; file di disk dihapus begitu
+                    # diklik, file yang tidak pernah diunduh dibersihkan sesudah EXPORT_TTL
+                    with open(siap[3], "rb") as f:
+                        st.download_button(f"Download {fmt.upper()} Laporan", f, file_name=f"laporan_{label_periode}.{fmt}",
+                                           mime=mime, on_click=_export_terkirim)
         else:
             st.info("Tidak ada transaksi di periode ini.")
 
 # ----------------------------
-# TAB 4: STATISTIK
+# HALAMAN 4: STATISTIK
 # ----------------------------
-with tab4:
+@st.fragment
+@outlet_sesi
+@perf.run("statistik")
+def halaman_statistik():
     st.header("Statistik Penjualan")
-    trx = fetch_transactions()
-    if not trx:
+    import pandas as pd
+    col1, col2 = st.columns(2)
+    with col1:
+        jendela = st.selectbox("Rentang Waktu", ["7 hari", "30 hari", "90 hari", "1 tahun", "Semua"], index=1, key="stat_jendela")
+    with col2:
+        top_n = st.slider("Tampilkan Top-N", min_value=3, max_value=30, value=10, key="stat_top_n")
+    hari = {"7 hari": 7, "30 hari": 30, "90 hari": 90, "1 tahun": 365}.get(jendela)
+    start = None
+    if hari:
+        start = laporan.period_bounds("hari", datetime.date.today() - datetime.timedelta(days=hari - 1))[0]
+
+    # produk terlaris: menu + toppings (toppings dihitung per porsi), dari rollup + cache per versi data
+    sales = cached_product_sales(st.session_state.outlet, fetch_data_version(), start)
+    if not sales:
         st.info("Belum ada data statistik.")
     else:
-        # hitung produk terlaris: menu + toppings (toppings dihitung per porsi)
-        counts = defaultdict(int)
-        for t in trx:
-            counts[t["menu"]] += t["jumlah"]
-            if t["toppings"]:
-                for top in t["toppings"].split(","):
-                    if top:
-                        counts[top] += t["jumlah"]
-        df_stats = pd.DataFrame([{"Produk":k, "Terjual":v} for k,v in counts.items()]).sort_values("Terjual", ascending=False)
+        with perf.timer("dataframe.statistik"):
+            df_stats = pd.DataFrame(sales)
         st.subheader("Produk Terlaris")
         st.dataframe(df_stats, use_container_width=True)
-        if not df_stats.empty:
-            fig, ax = plt.subplots()
-            ax.bar(df_stats["Produk"].head(10), df_stats["Terjual"].head(10))
-            ax.set_title("10 Produk Terlaris")
-            ax.set_ylabel("Jumlah Terjual")
-            plt.xticks(rotation=45, ha="right")
-            st.pyplot(fig)
+
+        with perf.timer("chart.statistik"):
+            import altair as alt  # lazy, seperti pandas
+            chart = alt.Chart(df_stats.head(top_n), title=f"{top_n} Produk Terlaris").mark_bar().encode(
+                x=alt.X("Produk", sort="-y", axis=alt.Axis(labelAngle=-45)),
+                y=alt.Y("Terjual", title="Jumlah Terjual"),
+                tooltip=["Produk", "Terjual"],
+            )
+            st.altair_chart(chart, use_container_width=True)
 
 # ----------------------------
-# TAB 5: PENGATURAN (admin only)
+# HALAMAN 5: PENGATURAN (admin only)
 # ----------------------------
-with tab5:
+@st.fragment
+@outlet_sesi
+@perf.run("pengaturan")
+def halaman_pengaturan():
     st.header("Pengaturan Produk")
+    import pandas as pd
     if st.session_state.role != "admin":
         st.info("Hanya admin yang dapat mengubah pengaturan produk.")
     else:
@@ -531,17 +581,195 @@ with tab5:
                     st.error(f"Gagal tambah produk: {err}")
 
         st.subheader("Hapus Produk")
-        nama_hapus = st.selectbox("Pilih Produk untuk Dihapus", [p["nama"] for p in fetch_products()], key="del_prod")
+        nama_hapus = st.selectbox("Pilih Produk untuk Dihapus", get_catalog().snapshot().names(), key="del_prod")
         if st.button("Hapus Produk"):
             delete_product_db(nama_hapus)
             st.success(f"Produk {nama_hapus} berhasil dihapus.")
 
         st.subheader("Manage Users")
-        st.write("Daftar user saat ini:")
         users = fetch_users()
         if users:
             st.table(pd.DataFrame(users))
-        st.info("Untuk menambah/ubah password user, edit DB SQLite atau implement UI tambahan.")
+        aksi_user = st.radio("Aksi", ["Tambah User", "Ganti Password", "Ganti Role", "Hapus User"],
+                             horizontal=True, key="user_aksi")
+        usernames = [u["username"] for u in users]
+        col1, col2 = st.columns(2)
+        if aksi_user == "Tambah User":
+            with col1:
+                user_baru = st.text_input("Username", key="user_baru").strip()
+                role_baru = st.selectbox("Role", ROLES, index=ROLES.index("kasir"), key="user_role_baru")
+                outlet_baru = None
+                if len(OUTLETS) > 1:
+                    pilihan_outlet = st.selectbox("Outlet", ["Semua"] + list(OUTLETS), key="user_outlet_baru")
+                    outlet_baru = None if pilihan_outlet == "Semua" else pilihan_outlet
+            with col2:
+                pwd_baru = st.text_input("Password", type="password", key="user_pwd_baru")
+                pwd_ulang = st.text_input("Ulangi Password", type="password", key="user_pwd_ulang")
+            if st.button("Tambah User"):
+                if not user_baru or not pwd_baru:
+                    st.error("Username dan password wajib diisi.")
+                elif pwd_baru != pwd_ulang:
+                    st.error("Password tidak sama.")
+                else:
+                    ok, err = add_user_db(user_baru, pwd_baru, role_baru, outlet_baru)
+                    if ok:
+                        st.success(f"User {user_baru} ditambahkan.")
+                    else:
+                        st.error(err)
+        elif aksi_user == "Ganti Password":
+            with col1:
+                user_pilih = st.selectbox("User", usernames, key="user_pwd_pilih")
+            with col2:
+                pwd_baru = st.text_input("Password Baru", type="password", key="user_pwd_ganti")
+            if st.button("Simpan Password"):
+                if not pwd_baru:
+                    st.error("Password tidak boleh kosong.")
+                else:
+                    ok, err = set_password_db(user_pilih, pwd_baru)
+                    if ok:
+                        st.success(f"Password {user_pilih} diganti; sesi lamanya otomatis logout.")
+                    else:
+                        st.error(err)
+        elif aksi_user == "Ganti Role":
+            with col1:
+                user_pilih = st.selectbox("User", usernames, key="user_role_pilih")
+            with col2:
+                role_pilih = st.selectbox("Role Baru", ROLES, key="user_role_ganti")
+            if st.button("Simpan Role"):
+                ok, err = set_role_db(user_pilih, role_pilih)
+                if ok:
+                    st.success(f"Role {user_pilih} sekarang {role_pilih}.")
+                else:
+                    st.error(err)
+        else:
+            with col1:
+                user_pilih = st.selectbox("User", usernames, key="user_hapus_pilih")
+            if st.button("Hapus User"):
+                if user_pilih == st.session_state.user:
+                    st.error("Tidak bisa menghapus user yang sedang login.")
+                else:
+                    ok, err = delete_user_db(user_pilih)
+                    if ok:
+                        st.success(f"User {user_pilih} dihapus.")
+                    else:
+                        st.error(err)
+
+        st.subheader("Rollup Penjualan Harian")
+        if st.button("Rebuild Rollup"):
+            n = rebuild_rollups()
+            st.success(f"Rollup dihitung ulang ({n} baris ringkasan harian).")
+
+        # transaksi bulan yang sudah ditutup dipindah ke tabel arsip per bulan (kasir/arsip.py)
+        st.subheader("Arsip & Ukuran Database")
+        ukuran = fetch_db_size()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Ukuran File", f"{ukuran['file_bytes'] / 2**20:,.1f} MB")
+        with col2:
+            st.metric("WAL", f"{ukuran['wal_bytes'] / 2**20:,.1f} MB")
+        with col3:
+            st.metric("Halaman Kosong", f"{ukuran['freelist_ratio']:.0%}")
+        with col4:
+            st.metric("Transaksi Panas / Arsip", f"{ukuran['transaksi_panas']:,} / {ukuran['transaksi_arsip']:,}")
+        if ukuran["batas_arsip"]:
+            st.caption(f"{ukuran['bulan_arsip']} bulan diarsip; transaksi sebelum {ukuran['batas_arsip'][:10]} ada di tabel arsip.")
+        if ukuran["per_tabel_bytes"]:
+            with st.expander("Ukuran per Tabel/Index"):
+                st.dataframe(pd.DataFrame(
+                    [{"Nama": nama, "MB": round(b / 2**20, 2)} for nama, b in ukuran["per_tabel_bytes"].items()]
+                ), use_container_width=True, hide_index=True)
+        col1, col2, col3 = st.columns([1,1,1])
+        with col1:
+            simpan_bulan = st.number_input("Bulan tetap di partisi panas", min_value=0, max_value=24, value=3, key="arsip_simpan")
+        with col2:
+            paksa_vacuum = st.checkbox("Paksa VACUUM", key="arsip_vacuum")
+        with col3:
+            if st.button("Arsipkan Sekarang"):
+                hasil = archive_transactions(int(simpan_bulan), True if paksa_vacuum else None)
+                if hasil["dipindah"]:
+                    st.success("Diarsip: " + ", ".join(f"{b} ({n:,} transaksi)" for b, n in hasil["dipindah"].items()))
+                else:
+                    st.info("Tidak ada bulan yang perlu diarsip.")
+                if hasil["vacuum"]:
+                    st.caption(f"VACUUM selesai; ukuran file sekarang {hasil['ukuran']['file_bytes'] / 2**20:,.1f} MB.")
+
+        ditolak = get_journal().rejected()
+        if ditolak:
+            st.subheader("Order Offline yang Ditolak")
+            st.warning("Order berikut sudah dibayar tetapi gagal dicatat saat sinkronisasi; periksa stok lalu catat manual.")
+            st.dataframe(pd.DataFrame([
+                {"Waktu": d["waktu"], "Metode": d["metode"], "Baris": len(d["lines"]),
+                 "Total": sum(line[3] for line in d["lines"]), "Alasan": d["alasan"]}
+                for d in ditolak
+            ]), use_container_width=True, hide_index=True)
+
+        st.subheader("Ledger Stok")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Snapshot Stok Sekarang"):
+                n_snap, _ = compact_stock_ledger()
+                st.success(f"{n_snap} snapshot stok ditulis.")
+        with col2:
+            if st.button("Cek Konsistensi Stok"):
+                selisih = fetch_stock_drift()
+                if selisih:
+                    st.warning("Stok produk tidak cocok dengan ledger:")
+                    st.table(pd.DataFrame(selisih))
+                else:
+                    st.success("Stok semua produk cocok dengan ledger.")
+
+        with st.expander("Statistik Koneksi DB, Antrean Tulis & Cache"):
+            st.json({
+                "pool": get_pool().stats(),
+                "writer": get_writer().stats(),
+                "jurnal": get_journal().stats(),
+                "sinkronisasi_jurnal": get_journal_sync().stats(),
+                "prakiraan": get_demand_model().stats(),
+                "katalog": get_catalog().stats(),
+                "qr": get_qr_cache().stats(),
+            })
+
+        with st.expander("Performa per Rerun"):
+            aktif = st.toggle("Aktifkan instrumentasi", value=perf.enabled(), key="perf_aktif",
+                              help="Bisa juga lewat environment KASIR_PERF=1. Selama mati, biayanya praktis nol.")
+            if aktif != perf.enabled():
+                perf.enable(aktif)
+            runs = perf.recent_runs()
+            if not runs:
+                st.info("Belum ada data. Aktifkan instrumentasi lalu buka halaman lain.")
+            else:
+                st.caption("Eksekusi halaman terakhir (semua sesi), terbaru dulu.")
+                st.dataframe(pd.DataFrame(
+                    [{k: r[k] for k in ("waktu", "halaman", "total_ms", "queries")} for r in runs]
+                ), use_container_width=True)
+                pilih = st.selectbox("Rincian eksekusi", range(len(runs)), key="perf_pilih",
+                                     format_func=lambda i: f"{runs[i]['waktu']} · {runs[i]['halaman']} · {runs[i]['total_ms']} ms")
+                st.dataframe(pd.DataFrame(
+                    [dict(operasi=op, **v) for op, v in runs[pilih]["ops"].items()]
+                ), use_container_width=True)
+                st.caption("Total per operasi sejak proses mulai.")
+                st.dataframe(pd.DataFrame(perf.totals()), use_container_width=True)
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button("Unduh Metrik (Prometheus)", data=perf.render_prometheus(),
+                                       file_name="kasir.prom", mime="text/plain")
+                with col2:
+                    if st.button("Reset Metrik"):
+                        perf.reset()
+                        st.rerun(scope="fragment")
+
+# ----------------------------
+# NAVIGASI
+# ----------------------------
+HALAMAN = {
+    "Kasir": halaman_kasir,
+    "Stok": halaman_stok,
+    "Laporan Penjualan": halaman_laporan,
+    "Statistik": halaman_statistik,
+    "Pengaturan": halaman_pengaturan,
+}
+pilihan_halaman = st.radio("Menu", list(HALAMAN), horizontal=True, key="nav", label_visibility="collapsed")
+HALAMAN[pilihan_halaman]()
 
 # ----------------------------
 # FOOTER
@@ -0,0 +1,347 @@
+# bench/bench_kasir.py
+"""Load test backend kasir (tanpa UI Streamlit).
+
+Mengisi DB sementara dengan riwayat transaksi sintetis, lalu menjalankan
+beberapa skenario secara paralel dan melaporkan latensi p50/p95/p99,
+throughput dan error lock-contention. Hasil bisa disimpan sebagai baseline
+JSON dan dibandingkan antar commit.
+
+Contoh::
+
+    python bench/bench_kasir.py --history 100000 --kasir 8 --durasi 10 --save bench/baseline.json
+    python bench/bench_kasir.py --history 100000 --kasir 8 --durasi 10 --compare bench/baseline.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from kasir import laporan, rollup  # noqa: E402
+from kasir.cart import Cart  # noqa: E402
+from kasir.db import ConnectionPool  # noqa: E402
+from kasir.schema import migrate  # noqa: E402
+from kasir.transaksi import process_sale  # noqa: E402
+from kasir.writer import WriteBehindWriter  # noqa: E402
+
+MENU = [("Seblak Original", 15000), ("Seblak Kerupuk", 12000), ("Seblak Ceker", 18000), ("Seblak Makaroni", 16000)]
+TOPPING = [("Kerupuk", 3000), ("Ceker", 5000), ("Makaroni", 4000), ("Sosis", 5000), ("Telur", 4000)]
+METODE = ["Tunai", "Tunai", "Tunai", "E-Wallet (OVO)", "E-Wallet (Gopay)", "E-Wallet (Dana)", "QRIS"]
+STOK_AWAL = 10 ** 9  # cukup besar supaya yang diukur lock, bukan stok habis
+
+
+# ----------------------------
+# WORKLOAD
+# ----------------------------
+def random_order(rng):
+    """Satu pesanan realistis: 1 menu, 0-3 topping, 1-3 porsi."""
+    menu, harga_menu = rng.choice(MENU)
+    toppings = rng.sample(TOPPING, k=rng.choices([0, 1, 2, 3], weights=[3, 4, 2, 1])[0])
+    jumlah = rng.choices([1, 2, 3], weights=[7, 2, 1])[0]
+    total = (harga_menu + sum(h for _, h in toppings)) * jumlah
+    return menu, [t for t, _ in toppings], jumlah, rng.choice(METODE), total
+
+
+def seed(path, history, rng):
+    """Buat DB baru berisi produk + ``history`` transaksi tersebar di 365 hari terakhir."""
+    pool = ConnectionPool(path, size=1)
+    with pool.connection() as conn:
+        migrate(conn)
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)",
+            [(n, "menu", h, STOK_AWAL) for n, h in MENU] + [(n, "topping", h, STOK_AWAL) for n, h in TOPPING],
+        )
+        conn.commit()
+        product_ids = {r["nama"]: r["id"] for r in cur.execute("SELECT id, nama FROM produk")}
+        harga = dict(MENU + TOPPING)
+        now = datetime.datetime.now()
+        batch = 20000
+        trx_id = 0
+        for offset in range(0, history, batch):
+            trx_rows, item_rows = [], []
+            for _ in range(min(batch, history - offset)):
+                trx_id += 1
+                menu, toppings, jumlah, metode, total = random_order(rng)
+                waktu = (now - datetime.timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+                trx_rows.append((trx_id, waktu, menu, ",".join(toppings), jumlah, metode, total))
+                for nama, tipe in [(menu, "menu")] + [(t, "topping") for t in toppings]:
+                    item_rows.append((trx_id, product_ids[nama], nama, tipe, jumlah, harga[nama]))
+            cur.execute("BEGIN")
+            cur.executemany(
+                "INSERT INTO transaksi (id, waktu, menu, toppings, jumlah, metode_pembayaran, total_harga) "
+                "VALUES (?,?,?,?,?,?,?)", trx_rows)
+            cur.executemany(
+                "INSERT INTO transaksi_item (transaksi_id, product_id, nama, tipe, jumlah, harga) "
+                "VALUES (?,?,?,?,?,?)", item_rows)
+            conn.commit()
+        rollup.rebuild(conn)
+        conn.execute("ANALYZE")
+    pool.close_all()
+
+
+# ----------------------------
+# SKENARIO
+# ----------------------------
+def op_checkout(conn, rng, ctx):
+    menu, toppings, jumlah, metode, total = random_order(rng)
+    ok, info, _ = process_sale(conn, menu, toppings, jumlah, metode, total)
+    return None if ok else info
+
+
+def op_checkout_antrean(conn, rng, ctx):
+    # lewat thread penulis tunggal (group commit), tanpa meminjam koneksi pool
+    menu, toppings, jumlah, metode, total = random_order(rng)
+    cart = Cart()
+    cart.add(menu, toppings, jumlah, total)
+    ok, info, _ = ctx["writer"].checkout(cart, metode)
+    return None if ok else info
+
+
+def op_laporan_halaman(conn, rng, ctx):
+    month = rng.choice(ctx["months"])
+    start, end = laporan.month_bounds(month)
+    laporan.fetch_transactions_page(conn, start, end)
+    laporan.summary(conn, start, end)
+
+
+def op_laporan_bulan(conn, rng, ctx):
+    start, end = laporan.month_bounds(rng.choice(ctx["months"]))
+    laporan.fetch_transactions(conn, start, end)
+
+
+def op_statistik(conn, rng, ctx):
+    laporan.product_sales(conn)
+    laporan.summary(conn)
+
+
+OPS = {
+    "checkout": op_checkout,
+    "checkout_antrean": op_checkout_antrean,
+    "laporan_halaman": op_laporan_halaman,
+    "laporan_bulan": op_laporan_bulan,
+    "statistik": op_statistik,
+}
+
+SCENARIOS = {
+    # nama: [(op, jumlah thread)], "kasir" diganti dengan argumen --kasir
+    "checkout": [("checkout", "kasir")],
+    "laporan": [("laporan_halaman", 2), ("laporan_bulan", 1)],
+    "statistik": [("statistik", 2)],
+    "campuran": [("checkout", "kasir"), ("laporan_halaman", 1), ("statistik", 1)],
+    "antrean": [("checkout_antrean", "kasir")],
+    "campuran_antrean": [("checkout_antrean", "kasir"), ("laporan_halaman", 1), ("statistik", 1)],
+}
+
+# operasi yang tidak butuh koneksi dari pool
+NO_POOL = {"checkout_antrean"}
+
+
+def classify(err):
+    msg = str(err).lower()
+    if "locked" in msg or "busy" in msg or "tidak ada koneksi" in msg:
+        return "lock"
+    if "stok" in msg:
+        return "stok"
+    return "lain"
+
+
+def run_scenario(path, spec, kasir, durasi, pool_size, seed_value, ctx):
+    pool = ConnectionPool(path, size=pool_size)
+    writer = None
+    if any(op in NO_POOL for op, _ in spec):
+        writer = ctx["writer"] = WriteBehindWriter(path)
+    stop = threading.Event()
+    lat = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def worker(op_name, idx):
+        rng = random.Random(f"{seed_value}-{op_name}-{idx}")
+        fn = OPS[op_name]
+        local_lat, local_err = [], Counter()
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                if op_name in NO_POOL:
+                    err = fn(None, rng, ctx)
+                else:
+                    with pool.connection() as conn:
+                        err = fn(conn, rng, ctx)
+            except sqlite3.Error as e:
+                err = e
+            local_lat.append(time.perf_counter() - t0)
+            if err is not None:
+                local_err[classify(err)] += 1
+        with lock:
+            lat.setdefault(op_name, []).extend(local_lat)
+            errors.setdefault(op_name, Counter()).update(local_err)
+
+    threads = []
+    for op_name, n in spec:
+        n = kasir if n == "kasir" else n
+        threads += [threading.Thread(target=worker, args=(op_name, i)) for i in range(n)]
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(durasi)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+
+    result = {op: summarize(samples, errors.get(op, Counter()), elapsed) for op, samples in lat.items()}
+    result["_pool"] = pool.stats()
+    pool.close_all()
+    if writer is not None:
+        writer.close()
+        result["_writer"] = writer.stats()
+        del ctx["writer"]
+    return result
+
+
+def percentile(sorted_samples, p):
+    if not sorted_samples:
+        return 0.0
+    k = min(len(sorted_samples) - 1, max(0, int(round(p / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[k]
+
+
+def summarize(samples, errors, elapsed):
+    s = sorted(samples)
+    ms = lambda v: round(v * 1000, 3)  # noqa: E731
+    return {
+        "ops": len(s),
+        "throughput_ops_s": round(len(s) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(s, 50)),
+        "p95_ms": ms(percentile(s, 95)),
+        "p99_ms": ms(percentile(s, 99)),
+        "max_ms": ms(s[-1]) if s else 0.0,
+        "errors": dict(errors),
+    }
+
+
+# ----------------------------
+# BASELINE
+# ----------------------------
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance):
+    """Cetak selisih terhadap baseline; kembalikan jumlah regresi di atas ``tolerance``."""
+    regressions = 0
+    for scen, ops in current["results"].items():
+        for op, r in ops.items():
+            if op.startswith("_"):
+                continue
+            b = baseline.get("results", {}).get(scen, {}).get(op)
+            if not b:
+                continue
+            for key, higher_is_worse in (("p95_ms", True), ("p99_ms", True), ("throughput_ops_s", False)):
+                old, new = b[key], r[key]
+                if not old:
+                    continue
+                delta = (new - old) / old
+                worse = delta > tolerance if higher_is_worse else delta < -tolerance
+                regressions += worse
+                flag = "  REGRESI" if worse else ""
+                print(f"{scen:>10}/{op:<16} {key:<17} {old:>10} -> {new:>10} ({delta:+.1%}){flag}")
+    return regressions
+
+
+def print_report(results):
+    print(f"{'skenario':>10}/{'operasi':<16} {'ops':>7} {'ops/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}  errors")
+    for scen, ops in results.items():
+        for op, r in ops.items():
+            if op.startswith("_"):
+                continue
+            print(f"{scen:>10}/{op:<16} {r['ops']:>7} {r['throughput_ops_s']:>9} "
+                  f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}  {r['errors'] or '-'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark backend kasir seblak.")
+    parser.add_argument("--db", help="pakai file DB ini (default: DB sementara yang diisi --history)")
+    parser.add_argument("--history", type=int, default=10000, help="jumlah transaksi historis sintetis")
+    parser.add_argument("--kasir", type=int, default=8, help="jumlah kasir (thread checkout) paralel")
+    parser.add_argument("--durasi", type=float, default=5.0, help="detik per skenario")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--skenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="simpan hasil sebagai baseline JSON")
+    parser.add_argument("--compare", help="bandingkan dengan baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="batas regresi relatif (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    path = args.db
+    if path is None:
+        tmpdir = tempfile.mkdtemp(prefix="bench_kasir_")
+        path = os.path.join(tmpdir, "bench.db")
+        t0 = time.perf_counter()
+        seed(path, args.history, random.Random(args.seed))
+        print(f"seed {args.history} transaksi: {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+    pool = ConnectionPool(path, size=1)
+    with pool.connection() as conn:
+        migrate(conn)
+        ctx = {"months": laporan.list_months(conn) or [datetime.date.today().strftime("%Y-%m")]}
+    pool.close_all()
+
+    results = {}
+    for name in args.skenario:
+        print(f"skenario {name} ...", file=sys.stderr)
+        results[name] = run_scenario(path, SCENARIOS[name], args.kasir, args.durasi, args.pool_size, args.seed, ctx)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "waktu": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "params": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        },
+        "results": results,
+    }
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline disimpan ke {args.save}", file=sys.stderr)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('waktu')})")
+        if compare(report, baseline, args.tolerance):
+            exit_code = 1
+
+    if tmpdir:
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
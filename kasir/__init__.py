@@ -0,0 +1 @@
+"""Lapisan inti (tanpa UI) untuk Sistem Kasir Seblak."""
@@ -0,0 +1,284 @@
+# kasir/arsip.py
+"""Arsip bulanan transaksi: partisi panas + satu tabel arsip per bulan.
+
+- ``transaksi`` / ``transaksi_item`` : partisi panas, hanya bulan berjalan
+  dan ``SIMPAN_BULAN`` bulan sebelumnya
+- ``transaksi_arsip_YYYY_MM`` / ``transaksi_item_arsip_YYYY_MM`` : bulan
+  yang sudah ditutup, dipindah oleh ``jalankan`` (id tetap sama)
+- view ``transaksi_semua`` / ``transaksi_item_semua`` : UNION ALL partisi
+  panas + semua arsip, dibuat ulang setiap ada tabel arsip baru
+
+Rollup harian (kasir/rollup.py) tidak ikut dipindah, jadi laporan yang
+dibaca dari rollup tetap mencakup bulan yang sudah diarsip. Agregasi atas
+baris mentah memilih sumbernya lewat ``sumber``: periode yang mulai di/
+sesudah batas arsip cukup membaca partisi panas, sisanya (termasuk "Semua")
+membaca view gabungan. Daftar transaksi dan export (yang butuh urutan)
+membaca tabel per partisi lewat ``partisi`` dan menggabungkannya terurut
+(kasir/laporan.py ``iter_transactions``), supaya halaman pertama "Semua"
+tidak perlu mengurutkan seluruh riwayat.
+
+Arsip disimpan di file DB yang sama (bukan file terpisah yang di-ATTACH)
+karena SQLite membatasi jumlah ATTACH per koneksi (default 10), sedangkan
+jumlah bulan terus bertambah.
+
+CLI::
+
+    python -m kasir.arsip jalankan [--simpan-bulan 3] [--vacuum]
+    python -m kasir.arsip ukuran
+"""
+import datetime
+import os
+import sqlite3
+
+from kasir.db import DB_PATH, ConnectionPool
+from kasir.schema import migrate
+
+SIMPAN_BULAN = 3
+VACUUM_FREELIST = 0.2     # VACUUM otomatis bila >= 20% halaman file kosong
+
+_PANAS = ("transaksi", "transaksi_item")
+_SEMUA = ("transaksi_semua", "transaksi_item_semua")
+
+
+def _bulan_berikut(bulan):
+    y, m = map(int, bulan.split("-"))
+    return f"{y + m // 12:04d}-{m % 12 + 1:02d}"
+
+
+def _tabel(bulan):
+    suffix = bulan.replace("-", "_")
+    return f"transaksi_arsip_{suffix}", f"transaksi_item_arsip_{suffix}"
+
+
+def bulan_arsip(conn):
+    """Bulan (YYYY-MM) yang sudah punya tabel arsip, terlama dulu."""
+    rows = conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name GLOB 'transaksi_arsip_[0-9][0-9][0-9][0-9]_[0-9][0-9]'
+        ORDER BY name
+    """).fetchall()
+    return [f"{r[0][16:20]}-{r[0][21:23]}" for r in rows]
+
+
+def batas(conn):
+    """Awal bulan sesudah arsip terakhir ("YYYY-MM-01 00:00:00"), atau None bila belum ada arsip."""
+    row = conn.execute("""
+        SELECT MAX(name) FROM sqlite_master
+        WHERE type = 'table' AND name GLOB 'transaksi_arsip_[0-9][0-9][0-9][0-9]_[0-9][0-9]'
+    """).fetchone()
+    if row[0] is None:
+        return None
+    return f"{_bulan_berikut(row[0][16:20] + '-' + row[0][21:23])}-01 00:00:00"
+
+
+def sumber(conn, start=None):
+    """``(tabel transaksi, tabel item)`` untuk periode yang mulai di ``start`` (None = sejak awal)."""
+    b = batas(conn)
+    if b is None or (start is not None and start >= b):
+        return _PANAS
+    return _SEMUA
+
+
+def partisi(conn, start=None, end=None):
+    """Pasangan tabel yang mencakup [start, end), untuk membaca baris mentah.
+
+    Partisi panas selalu ikut dan selalu pertama: biasanya hanya berisi bulan
+    sesudah batas arsip, tapi order jurnal offline yang baru tersinkron bisa
+    bertanggal di bulan yang sudah diarsip. Sesudahnya tabel arsip, terbaru
+    dulu. Tiap partisi di-query lewat index ``waktu``-nya sendiri lalu
+    digabung terurut oleh pemanggil, tanpa sort atas seluruh UNION ALL.
+    """
+    hasil = [_PANAS]
+    b = batas(conn)
+    if b is None or (start is not None and start >= b):
+        return hasil
+    for bulan in reversed(bulan_arsip(conn)):
+        if end is not None and f"{bulan}-01 00:00:00" >= end:
+            continue
+        if start is not None and f"{_bulan_berikut(bulan)}-01 00:00:00" <= start:
+            break
+        hasil.append(_tabel(bulan))
+    return hasil
+
+
+# ----------------------------
+# VIEW GABUNGAN
+# ----------------------------
+def _kolom(cur, tabel):
+    return [(r[1], r[2]) for r in cur.execute(f"PRAGMA table_info({tabel})").fetchall()]
+
+
+def buat_view(cur):
+    """(Re)create ``transaksi_semua`` / ``transaksi_item_semua``. Tanpa commit.
+
+    Kolom mengikuti tabel panas; kolom yang belum ada di arsip lama diisi NULL.
+    """
+    arsip = [_tabel(b) for b in bulan_arsip(cur)]
+    for i, (view, panas) in enumerate(zip(_SEMUA, _PANAS)):
+        kolom = [nama for nama, _ in _kolom(cur, panas)]
+        bagian = [f"SELECT {', '.join(kolom)} FROM {panas}"]
+        for tabel in (a[i] for a in arsip):
+            ada = {nama for nama, _ in _kolom(cur, tabel)}
+            pilih = ", ".join(k if k in ada else f"NULL AS {k}" for k in kolom)
+            bagian.append(f"SELECT {pilih} FROM {tabel}")
+        cur.execute(f"DROP VIEW IF EXISTS {view}")
+        cur.execute(f"CREATE VIEW {view} AS " + "\nUNION ALL ".join(bagian))
+
+
+# ----------------------------
+# PENGARSIPAN
+# ----------------------------
+def _buat_tabel_arsip(cur, bulan):
+    tabel, tabel_item = _tabel(bulan)
+    for arsip, panas, index_kolom in ((tabel, "transaksi", "waktu"), (tabel_item, "transaksi_item", "transaksi_id")):
+        kolom = ", ".join(
+            f"{nama} INTEGER PRIMARY KEY" if nama == "id" else f"{nama} {tipe}" for nama, tipe in _kolom(cur, panas)
+        )
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {arsip} ({kolom})")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{arsip}_{index_kolom} ON {arsip}({index_kolom})")
+    return tabel, tabel_item
+
+
+def arsipkan_bulan(cur, bulan):
+    """Pindahkan transaksi bulan ``bulan`` (YYYY-MM) ke tabel arsipnya. Tanpa commit.
+
+    Mengembalikan jumlah transaksi yang dipindah (0 = tidak ada tabel baru dibuat).
+    """
+    dari, sampai = f"{bulan}-01 00:00:00", f"{_bulan_berikut(bulan)}-01 00:00:00"
+    n = cur.execute("SELECT COUNT(*) FROM transaksi WHERE waktu >= ? AND waktu < ?", (dari, sampai)).fetchone()[0]
+    if n == 0:
+        return 0
+    tabel, tabel_item = _buat_tabel_arsip(cur, bulan)
+    kolom = ", ".join(nama for nama, _ in _kolom(cur, "transaksi"))
+    kolom_item = ", ".join(nama for nama, _ in _kolom(cur, "transaksi_item"))
+    cur.execute(f"""
+        INSERT INTO {tabel_item} ({kolom_item})
+        SELECT {kolom_item} FROM transaksi_item
+        WHERE transaksi_id IN (SELECT id FROM transaksi WHERE waktu >= ? AND waktu < ?)
+    """, (dari, sampai))
+    cur.execute(f"""
+        INSERT INTO {tabel} ({kolom}) SELECT {kolom} FROM transaksi WHERE waktu >= ? AND waktu < ?
+    """, (dari, sampai))
+    cur.execute("""
+        DELETE FROM transaksi_item
+        WHERE transaksi_id IN (SELECT id FROM transaksi WHERE waktu >= ? AND waktu < ?)
+    """, (dari, sampai))
+    cur.execute("DELETE FROM transaksi WHERE waktu >= ? AND waktu < ?", (dari, sampai))
+    buat_view(cur)
+    return n
+
+
+def jalankan(conn, simpan_bulan=SIMPAN_BULAN, vacuum=None, sekarang=None):
+    """Arsipkan semua bulan yang sudah ditutup, lalu ANALYZE / VACUUM bila perlu.
+
+    Bulan berjalan dan ``simpan_bulan`` bulan sebelumnya tetap di partisi
+    panas. Tiap bulan dipindah di transaksinya sendiri supaya lock write
+    tidak ditahan lama. ``vacuum`` None = hanya bila halaman kosong
+    >= ``VACUUM_FREELIST``. Mengembalikan dict ringkasan.
+    """
+    sekarang = sekarang or datetime.datetime.now()
+    bulan_ini = sekarang.year * 12 + sekarang.month - 1 - simpan_bulan
+    potong = f"{bulan_ini // 12:04d}-{bulan_ini % 12 + 1:02d}"
+    cur = conn.cursor()
+    pertama = cur.execute("SELECT MIN(waktu) FROM transaksi").fetchone()[0]
+
+    dipindah = {}
+    bulan = pertama[:7] if pertama else potong
+    while bulan < potong:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            n = arsipkan_bulan(cur, bulan)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        if n:
+            dipindah[bulan] = n
+        bulan = _bulan_berikut(bulan)
+
+    if dipindah:
+        cur.execute("ANALYZE")
+    ukuran_awal = ukuran(conn)
+    if vacuum is None:
+        vacuum = ukuran_awal["freelist_ratio"] >= VACUUM_FREELIST
+    if vacuum:
+        cur.execute("VACUUM")
+        # VACUUM menulis ulang seluruh file lewat WAL; kosongkan lagi supaya disk benar-benar lega
+        cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    cur.execute("INSERT OR REPLACE INTO app_config (key, value) VALUES ('arsip_terakhir', ?)",
+                (sekarang.strftime("%Y-%m-%d %H:%M:%S"),))
+    conn.commit()
+    return {"dipindah": dipindah, "vacuum": bool(vacuum), "ukuran": ukuran(conn) if vacuum else ukuran_awal}
+
+
+def terakhir(conn):
+    row = conn.execute("SELECT value FROM app_config WHERE key = 'arsip_terakhir'").fetchone()
+    return row[0] if row else None
+
+
+# ----------------------------
+# UKURAN DATABASE
+# ----------------------------
+def ukuran(conn):
+    """Metrik ukuran DB: file, WAL, halaman kosong, jumlah baris panas/arsip dan byte per tabel."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    wal = f"{path}-wal"
+    arsip = bulan_arsip(conn)
+    baris_arsip = sum(
+        conn.execute(f"SELECT COUNT(*) FROM {_tabel(b)[0]}").fetchone()[0] for b in arsip
+    )
+    try:
+        per_tabel = {
+            r[0]: r[1] for r in conn.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC"
+            ).fetchall()
+        }
+    except sqlite3.OperationalError:
+        per_tabel = None  # SQLite tanpa SQLITE_ENABLE_DBSTAT_VTAB
+    return {
+        "file_bytes": page_size * page_count,
+        "wal_bytes": os.path.getsize(wal) if path and os.path.exists(wal) else 0,
+        "freelist_bytes": page_size * freelist,
+        "freelist_ratio": round(freelist / page_count, 4) if page_count else 0.0,
+        "transaksi_panas": conn.execute("SELECT COUNT(*) FROM transaksi").fetchone()[0],
+        "transaksi_arsip": baris_arsip,
+        "bulan_arsip": len(arsip),
+        "batas_arsip": batas(conn),
+        "per_tabel_bytes": per_tabel,
+    }
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Arsip bulanan transaksi dan perawatan file DB.")
+    parser.add_argument("--db", default=DB_PATH, help="path file SQLite")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_jalan = sub.add_parser("jalankan", help="arsipkan bulan yang sudah ditutup (jalankan berkala, mis. cron harian)")
+    p_jalan.add_argument("--simpan-bulan", type=int, default=SIMPAN_BULAN,
+                         help="jumlah bulan lalu yang tetap di partisi panas")
+    p_jalan.add_argument("--vacuum", action="store_true", help="paksa VACUUM sesudah pengarsipan")
+    sub.add_parser("ukuran", help="tampilkan metrik ukuran database")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.db, size=1)
+    try:
+        with pool.connection() as conn:
+            migrate(conn)
+            if args.perintah == "jalankan":
+                hasil = jalankan(conn, args.simpan_bulan, True if args.vacuum else None)
+                for bulan, n in hasil["dipindah"].items():
+                    print(f"{bulan}: {n} transaksi diarsip")
+                print(f"{len(hasil['dipindah'])} bulan diarsip, VACUUM: {'ya' if hasil['vacuum'] else 'tidak'}")
+            else:
+                print(json.dumps(ukuran(conn), indent=2))
+    finally:
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
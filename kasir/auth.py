@@ -0,0 +1,220 @@
+# kasir/auth.py
+"""Hash password (scrypt bergaram) dan token sesi bertanda tangan.
+
+Format hash yang disimpan di ``users.password_hash``::
+
+    scrypt$<n>$<r>$<p>$<salt base64>$<hash base64>
+    pbkdf2_sha256$<iterasi>$<salt base64>$<hash base64>   (bila OpenSSL tanpa scrypt)
+
+Hash lama (SHA-256 polos, 64 karakter hex) tetap bisa diverifikasi dan
+``needs_rehash`` menandainya supaya di-upgrade sesudah login berhasil.
+
+Biaya scrypt diatur lewat ``KASIR_SCRYPT_N`` dan dipilih terhadap anggaran
+latensi login dengan::
+
+    python -m kasir.auth --budget-ms 250
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+SCRYPT_N = int(os.environ.get("KASIR_SCRYPT_N", 2 ** 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("KASIR_PBKDF2_ITER", 600_000))
+SALT_BYTES = 16
+DKLEN = 32
+
+HAS_SCRYPT = hasattr(hashlib, "scrypt")
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem default OpenSSL (32 MiB) terlalu kecil untuk n >= 2**15
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * n + 2 ** 20, dklen=DKLEN)
+
+
+# ----------------------------
+# HASH PASSWORD
+# ----------------------------
+def hash_password(password, n=None):
+    salt = os.urandom(SALT_BYTES)
+    if HAS_SCRYPT:
+        n = n or SCRYPT_N
+        digest = _scrypt(password, salt, n, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PBKDF2_ITERATIONS, DKLEN)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, stored):
+    """Cocokkan password dengan hash tersimpan (scrypt, PBKDF2 atau SHA-256 lama)."""
+    if not stored:
+        return False
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = (int(x) for x in parts[1:4])
+            digest = _scrypt(password, _unb64(parts[4]), n, r, p)
+            return hmac.compare_digest(digest, _unb64(parts[5]))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _unb64(parts[2]), int(parts[1]), DKLEN)
+            return hmac.compare_digest(digest, _unb64(parts[3]))
+    except (ValueError, TypeError):
+        return False
+    if len(parts) == 1:
+        legacy = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(legacy, stored)
+    return False
+
+
+def needs_rehash(stored):
+    """True untuk hash SHA-256 lama atau hash dengan biaya di bawah setelan sekarang."""
+    parts = (stored or "").split("$")
+    try:
+        if HAS_SCRYPT:
+            return not (parts[0] == "scrypt" and len(parts) == 6 and int(parts[1]) >= SCRYPT_N)
+        return not (parts[0] == "pbkdf2_sha256" and len(parts) == 4 and int(parts[1]) >= PBKDF2_ITERATIONS)
+    except ValueError:
+        return True
+
+
+def calibrate(budget_ms, n_min=2 ** 12, n_max=2 ** 20, repeat=3):
+    """Ukur scrypt untuk n = n_min, 2*n_min, ...; kembalikan ``(n_terbesar_dalam_anggaran, [(n, ms)])``."""
+    hasil = []
+    best = n_min
+    n = n_min
+    while n <= n_max:
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            _scrypt("kalibrasi", b"\0" * SALT_BYTES, n, SCRYPT_R, SCRYPT_P)
+            samples.append((time.perf_counter() - t0) * 1000)
+        ms = sorted(samples)[len(samples) // 2]
+        hasil.append((n, round(ms, 1)))
+        if ms > budget_ms:
+            break
+        best = n
+        n *= 2
+    return best, hasil
+
+
+# ----------------------------
+# TOKEN SESI
+# ----------------------------
+class SessionTokens:
+    """Token sesi bertanda tangan HMAC-SHA256 plus cache token yang sudah diverifikasi.
+
+    Payload: username, role saat login, ``versi`` sesi user (diganti dari
+    penghitung global saat password/role berubah atau user dibuat ulang ->
+    semua token lama gugur; role yang berlaku tetap dibaca dari DB), id sesi acak
+    (dicatat di server; logout menghapusnya), outlet tempat sesi login dan
+    waktu kedaluwarsa.
+    Token yang sudah pernah lolos cek tanda tangan disimpan di cache LRU,
+    jadi rerun berikutnya cukup satu lookup dict. Tanda tangan saja tidak
+    cukup: pemanggil tetap harus memastikan id sesinya masih tercatat.
+    """
+
+    def __init__(self, secret, ttl=12 * 3600, maxsize=1024):
+        self._secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._checks = 0
+        self._rejected = 0
+
+    def _sign(self, body):
+        return _b64(hmac.new(self._secret, body.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, username, role, versi, outlet=None, sid=None):
+        """Token baru; mengembalikan ``(token, payload)``. ``sid`` None = dibuat acak."""
+        payload = {"u": username, "r": role, "v": versi, "s": sid or secrets.token_urlsafe(16),
+                   "exp": int(time.time()) + self.ttl}
+        if outlet is not None:
+            payload["o"] = outlet
+        body = _b64(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        return f"{body}.{self._sign(body)}", payload
+
+    def verify(self, token):
+        """Payload token bila tanda tangan sah dan belum kedaluwarsa, selain itu None."""
+        if not token:
+            return None
+        now = time.time()
+        with self._lock:
+            payload = self._verified.get(token)
+            if payload is not None:
+                if payload["exp"] > now:
+                    self._verified.move_to_end(token)
+                    self._hits += 1
+                    return payload
+                del self._verified[token]
+            self._checks += 1
+        body, _, sig = token.partition(".")
+        try:
+            ok = hmac.compare_digest(sig, self._sign(body))
+            payload = json.loads(_unb64(body)) if ok else None
+        except (ValueError, TypeError):
+            payload = None
+        if not isinstance(payload, dict) or payload.get("exp", 0) <= now:
+            with self._lock:
+                self._rejected += 1
+            return None
+        with self._lock:
+            self._verified[token] = payload
+            while len(self._verified) > self.maxsize:
+                self._verified.popitem(last=False)
+        return payload
+
+    def forget(self, token=None, username=None):
+        """Buang token tertentu, atau semua token milik ``username``, dari cache."""
+        with self._lock:
+            if token is not None:
+                self._verified.pop(token, None)
+            if username is not None:
+                for t in [t for t, p in self._verified.items() if p["u"] == username]:
+                    del self._verified[t]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": len(self._verified),
+                "hits": self._hits,
+                "signature_checks": self._checks,
+                "rejected": self._rejected,
+            }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Kalibrasi biaya scrypt terhadap anggaran latensi login.")
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="batas waktu hash per login (ms)")
+    args = parser.parse_args(argv)
+
+    if not HAS_SCRYPT:
+        print(f"hashlib tanpa scrypt; dipakai PBKDF2-SHA256 {PBKDF2_ITERATIONS} iterasi (KASIR_PBKDF2_ITER)")
+        return
+    best, hasil = calibrate(args.budget_ms)
+    for n, ms in hasil:
+        print(f"n=2**{n.bit_length() - 1:<3} {ms:>8} ms{'  <-' if n == best else ''}")
+    print(f"\nexport KASIR_SCRYPT_N={best}   # sekarang: {SCRYPT_N}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# kasir/cart.py
+"""Keranjang belanja: beberapa baris menu (+ topping) dalam satu pesanan."""
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class CartLine:
+    menu: str
+    toppings: tuple
+    jumlah: int
+    total_harga: int
+
+    def stock_needs(self):
+        """Kebutuhan stok baris ini: {nama: qty}. Topping dihitung per porsi."""
+        need = Counter({self.menu: self.jumlah})
+        for t in self.toppings:
+            need[t] += self.jumlah
+        return need
+
+
+@dataclass
+class Cart:
+    lines: list = field(default_factory=list)
+
+    def add(self, menu, toppings, jumlah, total_harga):
+        self.lines.append(CartLine(menu, tuple(toppings), int(jumlah), int(total_harga)))
+
+    def remove(self, index):
+        del self.lines[index]
+
+    def clear(self):
+        self.lines.clear()
+
+    def __len__(self):
+        return len(self.lines)
+
+    @property
+    def total_harga(self):
+        return sum(line.total_harga for line in self.lines)
+
+    def stock_needs(self):
+        """Kebutuhan stok seluruh keranjang, diagregasi per produk.
+
+        Sepuluh mangkuk menu yang sama jadi satu entri (qty 10), sehingga
+        checkout cukup satu UPDATE per keranjang, bukan per baris.
+        """
+        need = Counter()
+        for line in self.lines:
+            need.update(line.stock_needs())
+        return dict(need)
+
+    def labels(self):
+        """Label untuk pesan error: 'Menu' / 'Topping' per nama produk."""
+        labels = {}
+        for line in self.lines:
+            for t in line.toppings:
+                labels.setdefault(t, "Topping")
+            labels[line.menu] = "Menu"
+        return labels
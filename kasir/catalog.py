@@ -0,0 +1,115 @@
+# kasir/catalog.py
+"""Cache katalog produk di memori dengan invalidasi write-through.
+
+Tabel produk kecil dan jarang berubah, tapi dibaca berkali-kali di setiap
+rerun (harga menu, harga topping, total, daftar stok). Katalog menyimpan
+snapshot immutable dari tabel produk, diindeks per id dan per nama, sehingga
+lookup harga/stok cukup satu baca dict.
+
+Setiap penulisan menaikkan ``version``. Snapshot hasil load yang dimulai
+sebelum sebuah penulisan tidak akan dipasang, jadi pembaca tidak pernah
+melihat data yang lebih tua dari penulisan terakhir.
+"""
+import threading
+from types import MappingProxyType
+
+
+class CatalogSnapshot:
+    """Isi tabel produk pada satu versi tertentu (read-only)."""
+
+    __slots__ = ("version", "products", "by_id", "by_name")
+
+    def __init__(self, version, rows):
+        products = tuple(MappingProxyType(dict(r)) for r in rows)
+        self.version = version
+        self.products = products
+        self.by_id = MappingProxyType({p["id"]: p for p in products})
+        self.by_name = MappingProxyType({p["nama"]: p for p in products})
+
+    def get(self, nama):
+        return self.by_name.get(nama)
+
+    def names(self, tipe=None):
+        return [p["nama"] for p in self.products if tipe is None or p["tipe"] == tipe]
+
+
+class ProductCatalog:
+    """Cache snapshot produk; ``loader`` mengembalikan baris produk terurut."""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot = None
+        self._hits = 0
+        self._loads = 0
+        self._invalidations = 0
+        self._stock_updates = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def snapshot(self):
+        snap = self._snapshot
+        if snap is not None:
+            self._hits += 1
+            return snap
+        with self._lock:
+            version = self._version
+        rows = self._loader()
+        snap = CatalogSnapshot(version, rows)
+        with self._lock:
+            self._loads += 1
+            # hanya pasang bila tidak ada penulisan selama load berlangsung
+            if self._version == version and self._snapshot is None:
+                self._snapshot = snap
+        return snap
+
+    def get(self, nama):
+        return self.snapshot().get(nama)
+
+    def get_by_id(self, product_id):
+        return self.snapshot().by_id.get(product_id)
+
+    def products(self):
+        return self.snapshot().products
+
+    def invalidate(self):
+        """Buang snapshot; load berikutnya membaca ulang dari DB."""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+            self._invalidations += 1
+
+    def set_stock(self, stok_by_name):
+        """Write-through stok terbaru ({nama: stok}) tanpa membaca ulang seluruh tabel."""
+        if not stok_by_name:
+            return
+        with self._lock:
+            self._version += 1
+            snap = self._snapshot
+            if snap is None:
+                return
+            if any(nama not in snap.by_name for nama in stok_by_name):
+                # produk tidak dikenal -> snapshot sudah tidak sinkron
+                self._snapshot = None
+                self._invalidations += 1
+                return
+            rows = [
+                dict(p, stok=stok_by_name[p["nama"]]) if p["nama"] in stok_by_name else p
+                for p in snap.products
+            ]
+            self._snapshot = CatalogSnapshot(self._version, rows)
+            self._stock_updates += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._version,
+                "cached": self._snapshot is not None,
+                "hits": self._hits,
+                "loads": self._loads,
+                "invalidations": self._invalidations,
+                "stock_updates": self._stock_updates,
+            }
@@ -0,0 +1,146 @@
+# kasir/db.py
+"""Pool koneksi SQLite yang dipakai bersama oleh semua helper DB.
+
+Koneksi dibuka sekali (mode WAL + pragma yang sudah di-tune) lalu dipinjam
+dan dikembalikan, bukan connect/close di setiap pemanggilan helper.
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DB_PATH = "kasir_seblak.db"
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",      # aman untuk WAL, jauh lebih cepat dari FULL
+    "busy_timeout": 5000,         # ms, tunggu lock writer lain sebelum error
+    "cache_size": -8000,          # negatif = KiB, jadi ~8 MB page cache per koneksi
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",         # ON DELETE SET NULL/CASCADE di transaksi_item
+}
+
+
+def connect(path, pragmas=None):
+    """Buka satu koneksi dengan row_factory Row dan pragma ``DEFAULT_PRAGMAS``."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for name, value in (DEFAULT_PRAGMAS if pragmas is None else pragmas).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Tidak ada koneksi yang bebas dalam batas waktu tunggu."""
+
+
+class ConnectionPool:
+    """Pool koneksi SQLite yang thread-safe dengan counter hit/miss/wait.
+
+    - hit  : koneksi idle langsung tersedia
+    - miss : pool membuka koneksi baru (selama belum mencapai ``size``)
+    - wait : semua koneksi sedang dipakai, pemanggil harus menunggu
+    """
+
+    def __init__(self, path, size=4, timeout=10.0, pragmas=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._idle = []           # stack: koneksi yang paling baru dipakai (cache-nya hangat) dipakai lagi
+        self._waiters = deque()   # antrean FIFO peminjam yang menunggu
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    def _connect(self):
+        return connect(self.path, self.pragmas)
+
+    def acquire(self):
+        with self._lock:
+            # jangan menyerobot antrean: selama ada yang menunggu, koneksi idle milik mereka
+            if self._idle and not self._waiters:
+                self._hits += 1
+                self._in_use += 1
+                return self._idle.pop()
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+                self._misses += 1
+                self._in_use += 1
+            else:
+                waiter = [threading.Event(), None]
+                self._waiters.append(waiter)
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+
+        # pool penuh -> tunggu koneksi diserahkan langsung oleh release()
+        start = time.perf_counter()
+        waiter[0].wait(self.timeout)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._waits += 1
+            self._wait_time += waited
+            self._max_wait = max(self._max_wait, waited)
+            conn = waiter[1]
+            if conn is None:
+                self._waiters.remove(waiter)
+                raise PoolTimeout(f"Tidak ada koneksi DB yang bebas setelah {self.timeout:.1f} detik")
+        return conn
+
+    def release(self, conn):
+        if conn.in_transaction:
+            # jangan sampai transaksi yang menggantung ikut terbawa ke peminjam berikutnya
+            conn.rollback()
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter[1] = conn
+                waiter[0].set()
+            else:
+                self._in_use -= 1
+                self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """Pinjam satu koneksi; otomatis dikembalikan ke pool setelah blok selesai."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": len(self._waiters),
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "wait_time_total_ms": round(self._wait_time * 1000, 3),
+                "wait_time_max_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            conn.close()
@@ -0,0 +1,126 @@
+# kasir/export.py
+"""Export laporan transaksi secara streaming (CSV / Parquet).
+
+Baris dibaca dari cursor (``laporan.iter_transactions``) per potongan dan langsung ditulis,
+jadi pemakaian memori tetap sebesar satu potongan berapa pun panjang
+riwayatnya. Parquet ditulis per row group (satu potongan = satu row group)
+dan butuh ``pyarrow`` (sudah ikut terpasang bersama streamlit).
+
+CLI (tanpa proses Streamlit)::
+
+    python -m kasir.export --db kasir_seblak.db --bulan 2025-01 --out laporan_2025-01.csv
+    python -m kasir.export --format parquet --dari 2025-01-01 --sampai 2025-04-01 --out q1.parquet
+"""
+import csv
+import io
+import itertools
+import sys
+
+from kasir.db import DB_PATH, ConnectionPool
+from kasir.laporan import iter_transactions, month_bounds
+from kasir.schema import migrate
+
+CHUNK_SIZE = 5000
+
+COLUMNS = ["id", "waktu", "menu", "toppings", "jumlah", "metode_pembayaran", "total_harga", "pesanan_id"]
+
+
+def iter_chunks(conn, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Yield list baris (tuple, urutan ``COLUMNS``) per potongan, terlama dulu."""
+    rows = iter_transactions(conn, start, end, terbaru=False)
+    while True:
+        chunk = [tuple(r) for r in itertools.islice(rows, chunk_size)]
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_csv(conn, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Yield potongan CSV (bytes UTF-8): header dulu, lalu satu potongan per ``chunk_size`` baris."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    yield buf.getvalue().encode("utf-8")
+    for rows in iter_chunks(conn, start, end, chunk_size):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+
+
+def write_csv(conn, fileobj, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Tulis CSV ke file biner yang sudah terbuka. Mengembalikan jumlah byte."""
+    written = 0
+    for chunk in iter_csv(conn, start, end, chunk_size):
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def write_parquet(conn, path, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Tulis Parquet ke ``path``, satu row group per potongan. Mengembalikan jumlah baris."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Export Parquet butuh paket pyarrow") from e
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("waktu", pa.string()),
+        ("menu", pa.string()),
+        ("toppings", pa.string()),
+        ("jumlah", pa.int64()),
+        ("metode_pembayaran", pa.string()),
+        ("total_harga", pa.int64()),
+        ("pesanan_id", pa.int64()),
+    ])
+    total = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in iter_chunks(conn, start, end, chunk_size):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema
+            ))
+            total += len(rows)
+        if total == 0:
+            writer.write_table(schema.empty_table())
+    return total
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export laporan transaksi (streaming).")
+    parser.add_argument("--db", default=DB_PATH, help="path file SQLite")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--bulan", help="satu bulan penuh, YYYY-MM")
+    parser.add_argument("--dari", help="waktu awal (inklusif), mis. 2025-01-01")
+    parser.add_argument("--sampai", help="waktu akhir (eksklusif), mis. 2025-02-01")
+    parser.add_argument("--out", help="file tujuan; CSV tanpa --out ditulis ke stdout")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    start, end = month_bounds(args.bulan) if args.bulan else (args.dari, args.sampai)
+    if args.format == "parquet" and not args.out:
+        parser.error("--out wajib untuk format parquet")
+
+    pool = ConnectionPool(args.db, size=1)
+    try:
+        with pool.connection() as conn:
+            migrate(conn)
+            if args.format == "parquet":
+                n = write_parquet(conn, args.out, start, end, args.chunk_size)
+                print(f"{n} baris ditulis ke {args.out}", file=sys.stderr)
+            elif args.out:
+                with open(args.out, "wb") as f:
+                    n = write_csv(conn, f, start, end, args.chunk_size)
+                print(f"{n} byte ditulis ke {args.out}", file=sys.stderr)
+            else:
+                write_csv(conn, sys.stdout.buffer, start, end, args.chunk_size)
+    finally:
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
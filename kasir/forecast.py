@@ -0,0 +1,260 @@
+# kasir/forecast.py
+"""Prakiraan permintaan per produk dan saran restock (NumPy, tervektorisasi).
+
+Model per produk (menu dan topping, topping dihitung per porsi)::
+
+    permintaan(hari) = level * indeks_hari[hari dalam minggu]
+
+- ``indeks_hari`` : rata-rata terjual per hari Senin..Minggu dibagi rata-rata
+  harian, ditarik ke 1 bila datanya masih sedikit
+- ``level``       : exponential smoothing (bobot ``alpha * (1 - alpha)**umur``)
+  atas permintaan yang sudah dibersihkan dari pola mingguan; dihitung sebagai
+  satu perkalian matriks, bukan loop per hari
+- sisa hari ini diperkirakan dari pola jam (``hourly_sales``, seluruh toko)
+  untuk hari dalam minggu yang sama
+
+Dari prakiraan ``HORIZON_HARI`` ke depan dihitung kapan stok habis (hari
+pertama kumulatif permintaan >= stok) dan jumlah restock supaya stok cukup
+untuk ``LEAD_TIME_HARI + COVER_HARI`` plus stok pengaman ``Z * sigma``.
+
+``DemandModel`` menyimpan matriks penjualan harian [produk x hari] di memori.
+Load penuh (dari rollup ``daily_product_sales``) hanya terjadi sekali per
+hari; sesudahnya ``refresh`` cukup membaca transaksi dengan id di atas
+high-water mark terakhir (``laporan.data_version``), berapa pun tanggalnya
+(termasuk order jurnal offline yang baru tersinkron), lalu menghitung ulang
+model dari matriks.
+"""
+import datetime
+import math
+import threading
+
+import numpy as np
+
+from kasir import laporan
+
+WINDOW_HARI = 365
+HORIZON_HARI = 60
+ALPHA = 0.3
+SUSUT_INDEKS = 4          # "minggu semu" yang menarik indeks hari ke 1 saat data sedikit
+SIGMA_HARI = 28           # jendela sisa (residual) untuk stok pengaman
+LEAD_TIME_HARI = 1
+COVER_HARI = 7
+Z = 1.65                  # ~95% tidak kehabisan selama lead time + cover
+JAM_HARI = 56             # pola jam dari 8 minggu terakhir
+
+
+def _tanggal(d):
+    return d.strftime("%Y-%m-%d")
+
+
+class DemandModel:
+    """Cache matriks penjualan harian + model yang di-refresh inkremental. Thread-safe."""
+
+    def __init__(self, window=WINDOW_HARI, alpha=ALPHA):
+        self.window = window
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._hari_ini = None
+        self._seen = None
+        self._names = {}          # nama -> baris matriks
+        self._hist = np.zeros((0, 0))
+        self._jam = np.zeros((7, 24))
+        self._fit = None
+        self._loads = 0
+        self._refreshes = 0
+        self._hits = 0
+
+    def reset(self):
+        """Paksa load penuh berikutnya (mis. sesudah rollup dihitung ulang)."""
+        with self._lock:
+            self._hari_ini = None
+
+    # ----------------------------
+    # DATA
+    # ----------------------------
+    def _add(self, rows):
+        # rows: (tanggal, nama, terjual); tanggal di luar jendela diabaikan
+        if not rows:
+            return
+        tanggal, nama, terjual = zip(*rows)
+        for n in nama:
+            if n not in self._names:
+                self._names[n] = len(self._names)
+        if len(self._names) > self._hist.shape[0]:
+            tambah = np.zeros((len(self._names) - self._hist.shape[0], self._hist.shape[1]))
+            self._hist = np.vstack([self._hist, tambah])
+        mulai = np.datetime64(self._hari_ini - datetime.timedelta(days=self.window), "D")
+        kolom = (np.array(tanggal, dtype="datetime64[D]") - mulai).astype(int)
+        baris = np.array([self._names[n] for n in nama])
+        di_jendela = (kolom >= 0) & (kolom < self._hist.shape[1])
+        np.add.at(self._hist, (baris[di_jendela], kolom[di_jendela]), np.array(terjual, dtype=float)[di_jendela])
+
+    def _load(self, conn, hari_ini):
+        mulai = hari_ini - datetime.timedelta(days=self.window)
+        self._hari_ini = hari_ini
+        self._names = {}
+        self._hist = np.zeros((0, self.window + 1))  # kolom terakhir = hari ini
+        # rollup dan high-water mark dibaca dalam satu snapshot baca
+        conn.execute("BEGIN")
+        try:
+            self._seen = laporan.data_version(conn)
+            self._add(conn.execute(
+                "SELECT tanggal, nama, terjual FROM daily_product_sales WHERE tanggal >= ?", (_tanggal(mulai),)
+            ).fetchall())
+            jam = conn.execute("""
+                SELECT tanggal, jam, total_terjual FROM hourly_sales WHERE tanggal >= ? AND tanggal < ?
+            """, (_tanggal(hari_ini - datetime.timedelta(days=JAM_HARI)), _tanggal(hari_ini))).fetchall()
+        finally:
+            conn.rollback()
+        self._jam = np.zeros((7, 24))
+        for tanggal, j, terjual in jam:
+            self._jam[datetime.date.fromisoformat(tanggal).weekday(), j] += terjual
+        self._loads += 1
+
+    def _catch_up(self, conn, version):
+        rows = conn.execute("""
+            SELECT substr(t.waktu, 1, 10), i.nama, SUM(i.jumlah)
+            FROM transaksi t JOIN transaksi_item i ON i.transaksi_id = t.id
+            WHERE t.id > ? AND t.id <= ?
+            GROUP BY substr(t.waktu, 1, 10), i.nama
+        """, (self._seen, version)).fetchall()
+        self._add(rows)
+        self._seen = version
+        self._refreshes += 1
+
+    def refresh(self, conn, hari_ini=None):
+        """Sinkronkan dengan DB: load penuh bila ganti hari, selain itu hanya penjualan baru."""
+        hari_ini = hari_ini or datetime.date.today()
+        with self._lock:
+            if self._hari_ini != hari_ini:
+                self._load(conn, hari_ini)
+            else:
+                version = laporan.data_version(conn)
+                if version == self._seen:
+                    self._hits += 1
+                    return
+                self._catch_up(conn, version)
+            self._fit = None
+
+    # ----------------------------
+    # MODEL
+    # ----------------------------
+    def _fitted(self):
+        """``(level, indeks_hari [P x 7], sigma)`` dari hari-hari yang sudah lewat (tanpa hari ini)."""
+        if self._fit is not None:
+            return self._fit
+        x = self._hist[:, :-1]
+        n_prod, n_hari = x.shape
+        mulai = self._hari_ini - datetime.timedelta(days=self.window)
+        dow = (np.arange(n_hari) + mulai.weekday()) % 7
+        onehot = np.eye(7)[dow]                                     # [hari x 7]
+
+        # hanya hari sejak produk pertama kali terjual (produk baru tidak dianggap 0 setahun)
+        terjual = x > 0
+        pertama = np.where(terjual.any(axis=1), terjual.argmax(axis=1), n_hari)
+        aktif = np.arange(n_hari)[None, :] >= pertama[:, None]     # [P x hari]
+
+        xa = np.where(aktif, x, 0.0)
+        n_aktif = aktif.sum(axis=1)
+        rata = np.divide(xa.sum(axis=1), n_aktif, out=np.zeros(n_prod), where=n_aktif > 0)
+        jumlah_dow = xa @ onehot                                     # [P x 7]
+        n_dow = aktif @ onehot
+        rata_dow = np.divide(jumlah_dow, n_dow, out=np.zeros_like(jumlah_dow), where=n_dow > 0)
+        indeks = np.divide(rata_dow, rata[:, None], out=np.ones_like(rata_dow), where=rata[:, None] > 0)
+        indeks = (n_dow * indeks + SUSUT_INDEKS) / (n_dow + SUSUT_INDEKS)
+
+        musiman = indeks[:, dow]                                     # [P x hari]
+        bersih = np.divide(xa, musiman, out=xa.copy(), where=musiman > 0)
+        bobot = self.alpha * (1 - self.alpha) ** (n_hari - 1 - np.arange(n_hari))
+        bobot_aktif = aktif * bobot
+        total_bobot = bobot_aktif.sum(axis=1)
+        level = np.divide((bersih * bobot_aktif).sum(axis=1), total_bobot,
+                          out=np.zeros(n_prod), where=total_bobot > 0)
+
+        sisa = (xa - level[:, None] * musiman)[:, -SIGMA_HARI:]
+        aktif_akhir = aktif[:, -SIGMA_HARI:]
+        n_sisa = np.maximum(aktif_akhir.sum(axis=1), 1)
+        sigma = np.sqrt((np.where(aktif_akhir, sisa, 0.0) ** 2).sum(axis=1) / n_sisa)
+
+        self._fit = (level, indeks, sigma)
+        return self._fit
+
+    def _sisa_hari_ini(self, sekarang):
+        """Porsi permintaan hari ini yang belum lewat, dari pola jam hari yang sama."""
+        jam = sekarang.hour + sekarang.minute / 60
+        profil = self._jam[sekarang.weekday()]
+        total = profil.sum()
+        if total <= 0:
+            return max(0.0, 1 - jam / 24)
+        h = sekarang.hour
+        return float((profil[h + 1:].sum() + profil[h] * (1 - sekarang.minute / 60)) / total)
+
+    def predict(self, products, sekarang=None, horizon=HORIZON_HARI,
+                lead_time=LEAD_TIME_HARI, cover=COVER_HARI, z=Z):
+        """Prakiraan per produk untuk ``products`` (dict dengan nama, tipe, stok).
+
+        Tiap hasil: ``per_hari`` (rata-rata prakiraan 7 hari), ``habis_dalam``
+        (hari sampai stok habis, 0 = hari ini; None bila melewati ``horizon``),
+        ``tanggal_habis``, ``pesan`` (saran jumlah restock) dan ``status``.
+        """
+        sekarang = sekarang or datetime.datetime.now()
+        with self._lock:
+            level, indeks, sigma = self._fitted()
+            rows = [self._names.get(p["nama"]) for p in products]
+            sisa_hari_ini = self._sisa_hari_ini(sekarang)
+        n = len(products)
+        ada = np.array([r is not None for r in rows], dtype=bool)
+        idx = np.array([r if r is not None else 0 for r in rows], dtype=int)
+        lv = np.where(ada, level[idx] if len(level) else 0.0, 0.0)
+        ind = indeks[idx] if len(level) else np.ones((n, 7))
+        sg = np.where(ada, sigma[idx] if len(level) else 0.0, 0.0)
+        stok = np.array([p["stok"] for p in products], dtype=float)
+
+        dow = (np.arange(horizon) + sekarang.weekday()) % 7
+        prakiraan = lv[:, None] * ind[:, dow]                        # [P x horizon], kolom 0 = hari ini
+        prakiraan[:, 0] *= sisa_hari_ini
+        kumulatif = prakiraan.cumsum(axis=1)
+        habis = kumulatif >= stok[:, None]
+        habis_dalam = np.where(habis.any(axis=1) & (lv > 0), habis.argmax(axis=1), -1)
+        habis_dalam = np.where(stok <= 0, 0, habis_dalam)
+
+        kebutuhan = kumulatif[:, min(lead_time + cover, horizon - 1)] + z * sg * math.sqrt(lead_time + cover)
+        pesan = np.ceil(np.maximum(kebutuhan - stok, 0))
+        per_hari = prakiraan[:, 1:8].mean(axis=1)
+
+        hari_ini = sekarang.date()
+        hasil = []
+        for i, p in enumerate(products):
+            d = int(habis_dalam[i])
+            hasil.append({
+                "nama": p["nama"],
+                "tipe": p["tipe"],
+                "stok": p["stok"],
+                "per_hari": round(float(per_hari[i]), 1),
+                "habis_dalam": None if d < 0 else d,
+                "tanggal_habis": None if d < 0 else _tanggal(hari_ini + datetime.timedelta(days=d)),
+                "pesan": int(pesan[i]),
+                "status": status(None if d < 0 else d, p["stok"], lead_time, cover),
+            })
+        return hasil
+
+    def stats(self):
+        with self._lock:
+            return {
+                "produk": len(self._names),
+                "hari": int(self._hist.shape[1]),
+                "loads": self._loads,
+                "refreshes": self._refreshes,
+                "hits": self._hits,
+            }
+
+
+def status(habis_dalam, stok, lead_time=LEAD_TIME_HARI, cover=COVER_HARI):
+    """Label stok dari prakiraan: Habis / Hampir Habis (sebelum restock tiba) / Cukup / Banyak."""
+    if stok <= 0:
+        return "Habis"
+    if habis_dalam is None:
+        return "Banyak"
+    if habis_dalam <= lead_time:
+        return "Hampir Habis"
+    return "Cukup" if habis_dalam <= lead_time + cover else "Banyak"
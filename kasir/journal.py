@@ -0,0 +1,277 @@
+# kasir/journal.py
+"""Jurnal order lokal (append-only JSONL) + sinkronisasi latar ke database.
+
+Setiap checkout ditulis dulu ke jurnal (flush + fsync) dengan idempotency
+key, baru diterapkan ke SQLite lewat thread penulis. Bila DB sedang tidak
+bisa ditulis (terkunci, instance restart di tengah batch, file belum siap),
+penjualan tetap diterima: entrinya menunggu di jurnal dan ``JournalSync``
+memutarnya ulang secara bulk. Karena ``pesanan.idempotency_key`` unik,
+entri yang sudah pernah ter-commit tidak akan diterapkan dua kali, jadi
+aman mengulang apa pun yang belum di-ack, termasuk sesudah crash.
+
+Baris jurnal::
+
+    {"key": "...", "waktu": "...", "metode": "...", "lines": [[menu, [topping], jumlah, total_harga]]}
+    {"ack": "<key>", "status": "ok" | "ditolak", "info": "..."}
+
+Entri yang ditolak saat sinkronisasi (mis. stok sudah habis) padahal kasir
+sudah menerima pembayaran disalin ke ``<nama>.gagal.jsonl`` untuk ditangani
+admin.
+"""
+import datetime
+import json
+import os
+import threading
+import uuid
+
+from kasir.cart import Cart
+
+JOURNAL_PATH = "kasir_journal.jsonl"
+
+
+def entry_cart(entry):
+    cart = Cart()
+    for menu, toppings, jumlah, total_harga in entry["lines"]:
+        cart.add(menu, toppings, jumlah, total_harga)
+    return cart
+
+
+class OrderJournal:
+    """Jurnal JSONL yang tahan crash; daftar entri yang belum di-ack disimpan di memori."""
+
+    def __init__(self, path=JOURNAL_PATH, fsync=True, compact_every=500):
+        self.path = path
+        root, _ = os.path.splitext(path)
+        self.gagal_path = f"{root}.gagal.jsonl"
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._pending = {}        # key -> entry, urutan tulis
+        self._inflight = set()    # key yang sedang diterapkan langsung oleh checkout
+        self._acked_since_compact = 0
+        self._appended = 0
+        self._resolved = 0
+        self._rejected = 0
+        self._load()
+        self._file = open(self.path, "ab")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for raw in data.splitlines():
+            try:
+                rec = json.loads(raw)
+            except ValueError:
+                continue  # baris terpotong karena crash saat menulis
+            if "ack" in rec:
+                self._pending.pop(rec["ack"], None)
+                self._acked_since_compact += 1
+            elif "key" in rec:
+                self._pending[rec["key"]] = rec
+        if data and not data.endswith(b"\n"):
+            # jangan sampai entri berikutnya tersambung ke baris yang terpotong
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+
+    def _write(self, records):
+        self._file.write(b"".join(json.dumps(r, separators=(",", ":")).encode("utf-8") + b"\n" for r in records))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, cart, metode_pembayaran, inflight=True):
+        """Catat checkout secara durable; kembalikan entri (dengan ``key`` dan ``waktu``).
+
+        Dengan ``inflight`` pemanggil sendiri yang menerapkannya; sinkronisasi
+        latar baru mengambil alih sesudah ``release``.
+        """
+        entry = {
+            "key": uuid.uuid4().hex,
+            "waktu": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "metode": metode_pembayaran,
+            "lines": [[line.menu, list(line.toppings), line.jumlah, line.total_harga] for line in cart.lines],
+        }
+        with self._lock:
+            self._write([entry])
+            self._pending[entry["key"]] = entry
+            if inflight:
+                self._inflight.add(entry["key"])
+            self._appended += 1
+        return entry
+
+    def release(self, key):
+        """Serahkan entri ke sinkronisasi latar (mis. DB sedang tidak bisa ditulis)."""
+        with self._lock:
+            self._inflight.discard(key)
+
+    def resolve(self, results, dari_sync=False):
+        """Ack ``[(key, ok, info)]``. Penolakan dari sinkronisasi disalin ke file gagal."""
+        if not results:
+            return
+        with self._lock:
+            self._write([
+                {"ack": key, "status": "ok" if ok else "ditolak", "info": None if ok else str(info)}
+                for key, ok, info in results
+            ])
+            ditolak = []
+            for key, ok, info in results:
+                entry = self._pending.pop(key, None)
+                self._inflight.discard(key)
+                self._resolved += 1
+                if not ok and dari_sync and entry is not None:
+                    ditolak.append(dict(entry, alasan=str(info)))
+            self._rejected += len(ditolak)
+            self._acked_since_compact += len(results)
+            if ditolak:
+                with open(self.gagal_path, "a", encoding="utf-8") as f:
+                    for d in ditolak:
+                        f.write(json.dumps(d) + "\n")
+            if self._acked_since_compact >= self.compact_every:
+                self._compact()
+
+    def pending(self, limit=None):
+        """Entri yang belum di-ack dan tidak sedang diterapkan langsung, terlama dulu."""
+        with self._lock:
+            entries = [e for k, e in self._pending.items() if k not in self._inflight]
+        return entries[:limit] if limit else entries
+
+    def _compact(self):
+        # tulis ulang hanya entri yang belum di-ack; os.replace atomik, jadi crash di sini aman
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(json.dumps(e, separators=(",", ":")).encode("utf-8") + b"\n"
+                             for e in self._pending.values()))
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "ab")
+        self._acked_since_compact = 0
+
+    def rejected(self):
+        """Entri yang ditolak saat sinkronisasi (isi file gagal)."""
+        if not os.path.exists(self.gagal_path):
+            return []
+        with open(self.gagal_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending) - len(self._inflight),
+                "inflight": len(self._inflight),
+                "appended": self._appended,
+                "resolved": self._resolved,
+                "rejected": self._rejected,
+            }
+
+
+class JournalSync:
+    """Thread latar yang memutar ulang entri jurnal yang tertunda lewat thread penulis.
+
+    Tiap putaran mengantrekan sampai ``batch`` entri sekaligus; thread penulis
+    menggabungkannya jadi beberapa transaksi besar (group commit). Selama DB
+    masih gagal, putaran berikutnya menunggu ``interval`` detik (dikali dua
+    tiap gagal, maksimal ``max_interval``).
+    """
+
+    def __init__(self, journal, writer, interval=2.0, max_interval=60.0, batch=500):
+        self.journal = journal
+        self.writer = writer
+        self.interval = interval
+        self.max_interval = max_interval
+        self.batch = batch
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._applied = 0
+        self._rejected = 0
+        self._errors = 0
+        self._last_error = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="kasir-journal-sync", daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self, timeout=10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def sync_once(self):
+        """Satu putaran sinkronisasi. Mengembalikan ``(diterapkan, ditolak, error)``."""
+        entries = self.journal.pending(self.batch)
+        if not entries:
+            return 0, 0, None
+        futures = [
+            (e["key"], self.writer.submit(entry_cart(e), e["metode"], e["key"], e["waktu"]))
+            for e in entries
+        ]
+        results, error = [], None
+        for key, fut in futures:
+            try:
+                ok, info, _ = fut.result()
+            except Exception as e:
+                error = str(e)  # tetap di jurnal, dicoba lagi putaran berikutnya
+                continue
+            results.append((key, ok, info))
+        self.journal.resolve(results, dari_sync=True)
+        applied = sum(1 for _, ok, _ in results if ok)
+        with self._lock:
+            self._runs += 1
+            self._applied += applied
+            self._rejected += len(results) - applied
+            if error is not None:
+                self._errors += 1
+                self._last_error = error
+        return applied, len(results) - applied, error
+
+    def drain(self):
+        """Putar ulang semua entri tertunda sekarang (di thread pemanggil) sampai habis atau DB gagal.
+
+        Dipakai saat startup, sebelum ada pekerjaan lain yang bergantung pada
+        data yang sudah lengkap (mis. snapshot stok). Mengembalikan
+        ``(diterapkan, ditolak, error)``.
+        """
+        total_applied = total_rejected = 0
+        while True:
+            applied, rejected, error = self.sync_once()
+            total_applied += applied
+            total_rejected += rejected
+            if error is not None or not (applied or rejected):
+                return total_applied, total_rejected, error
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop.is_set():
+            _, _, error = self.sync_once()
+            if error is None and self.journal.pending(1):
+                continue  # masih ada sisa, langsung putaran berikutnya
+            delay = min(delay * 2, self.max_interval) if error else self.interval
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "runs": self._runs,
+                "applied": self._applied,
+                "rejected": self._rejected,
+                "errors": self._errors,
+                "last_error": self._last_error,
+            }
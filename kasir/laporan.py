@@ -0,0 +1,340 @@
+# kasir/laporan.py
+"""Query laporan & statistik; agregasi dikerjakan SQLite, bukan loop Python.
+
+Semua filter periode memakai rentang setengah terbuka ``waktu >= start AND
+waktu < end`` (string "YYYY-MM-DD HH:MM:SS"), sehingga index ``waktu`` bisa
+dipakai. ``None`` berarti tanpa batas di sisi tersebut.
+
+Angka ringkasan dibaca dari rollup harian (kasir/rollup.py) bila rentangnya
+jatuh tepat di pergantian hari, jadi biayanya tidak tumbuh dengan jumlah
+transaksi.
+"""
+import datetime
+import heapq
+import itertools
+
+from kasir import arsip
+
+# kolom toppings dirangkai dari transaksi_item (bukan string dipisah koma), urut sesuai input (id item);
+# {transaksi}/{item}: satu partisi (panas / arsip bulanan), lihat ``iter_transactions``
+TRANSAKSI_SELECT = """
+    SELECT t.id, t.waktu, t.menu,
+           (SELECT group_concat(nama, ', ') FROM (
+               SELECT i.nama FROM {item} i
+               WHERE i.transaksi_id = t.id AND i.tipe = 'topping' ORDER BY i.id
+           )) AS toppings,
+           t.jumlah, t.metode_pembayaran, t.total_harga, t.pesanan_id
+    FROM {transaksi} t
+"""
+
+PAGE_SIZE = 100
+
+METODE_PEMBAYARAN = ["Tunai", "E-Wallet (OVO)", "E-Wallet (Gopay)", "E-Wallet (Dana)", "QRIS"]
+
+HARI = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+
+
+# ----------------------------
+# PERIODE
+# ----------------------------
+def _fmt(d):
+    return d.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def month_bounds(month):
+    """'YYYY-MM' -> (awal bulan, awal bulan berikutnya)."""
+    year, mon = (int(x) for x in month.split("-"))
+    start = datetime.datetime(year, mon, 1)
+    end = datetime.datetime(year + (mon == 12), mon % 12 + 1, 1)
+    return _fmt(start), _fmt(end)
+
+
+def period_bounds(kind, day):
+    """Rentang untuk 'hari', 'minggu' (Senin-Minggu) atau 'bulan' yang memuat ``day``."""
+    day = datetime.datetime(day.year, day.month, day.day)
+    if kind == "hari":
+        start, end = day, day + datetime.timedelta(days=1)
+    elif kind == "minggu":
+        start = day - datetime.timedelta(days=day.weekday())
+        end = start + datetime.timedelta(days=7)
+    elif kind == "bulan":
+        return month_bounds(day.strftime("%Y-%m"))
+    else:
+        raise ValueError(f"Periode tidak dikenal: {kind}")
+    return _fmt(start), _fmt(end)
+
+
+def waktu_filter(start, end, alias="t"):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"{alias}.waktu >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{alias}.waktu < ?")
+        params.append(end)
+    return clauses, params
+
+
+# ----------------------------
+# QUERIES
+# ----------------------------
+def data_version(conn):
+    """Penanda murah bahwa ada penjualan baru: high-water mark AUTOINCREMENT transaksi.
+
+    Tidak pernah turun (juga setelah baris dihapus/diarsip), jadi aman dipakai
+    sebagai bagian key cache hasil agregasi.
+    """
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transaksi'").fetchone()
+    return row[0] if row else 0
+
+
+def list_months(conn):
+    """Daftar bulan (YYYY-MM) yang punya transaksi, terbaru dulu.
+
+    Setara dengan ``SELECT DISTINCT substr(waktu,1,7)``, tapi melompat per
+    bulan lewat index waktu (satu seek per bulan) alih-alih memindai semua baris.
+    Bulan yang sudah diarsip diambil dari nama tabel arsipnya.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        WITH RECURSIVE bulan(b) AS (
+            SELECT substr(MAX(waktu), 1, 7) FROM transaksi
+            UNION ALL
+            SELECT (SELECT substr(MAX(waktu), 1, 7) FROM transaksi WHERE waktu < bulan.b)
+            FROM bulan WHERE bulan.b IS NOT NULL
+        )
+        SELECT b FROM bulan WHERE b IS NOT NULL
+    """)
+    return sorted({r[0] for r in cur.fetchall()}.union(arsip.bulan_arsip(conn)), reverse=True)
+
+
+def _urutan(row):
+    return row["waktu"], row["id"]
+
+
+def iter_transactions(conn, start=None, end=None, cursor=None, terbaru=True, limit=None):
+    """Baris ``TRANSAKSI_SELECT`` periode [start, end) dari semua partisi, urut ``(waktu, id)``.
+
+    Tiap partisi (kasir/arsip.py) di-query lewat index ``waktu``-nya sendiri
+    (paling banyak ``limit`` baris per partisi) lalu digabung dengan merge
+    terurut, jadi partisi panas yang berisi order terlambat untuk bulan yang
+    sudah diarsip tetap muncul di tempatnya. ``cursor`` ``(waktu, id)``:
+    hanya baris sebelumnya (``terbaru``) atau sesudahnya.
+    """
+    clauses, params = waktu_filter(start, end)
+    if cursor is not None:
+        clauses.append("(t.waktu, t.id) < (?, ?)" if terbaru else "(t.waktu, t.id) > (?, ?)")
+        params.extend(cursor)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = " ORDER BY t.waktu DESC, t.id DESC" if terbaru else " ORDER BY t.waktu, t.id"
+    if limit is not None:
+        order += f" LIMIT {int(limit)}"
+    bagian = []
+    for transaksi, item in arsip.partisi(conn, start, end):
+        cur = conn.cursor()
+        cur.execute(TRANSAKSI_SELECT.format(transaksi=transaksi, item=item) + where + order, params)
+        bagian.append(cur)
+    return heapq.merge(*bagian, key=_urutan, reverse=terbaru)
+
+
+def fetch_transactions(conn, start=None, end=None):
+    return [dict(r) for r in iter_transactions(conn, start, end)]
+
+
+def fetch_transactions_page(conn, start=None, end=None, cursor=None, limit=PAGE_SIZE):
+    """Satu halaman transaksi dengan keyset pagination (terbaru dulu).
+
+    ``cursor`` adalah ``(waktu, id)`` baris terakhir halaman sebelumnya.
+    Mengembalikan ``(rows, next_cursor)``; ``next_cursor`` None di halaman terakhir.
+    """
+    rows = [dict(r) for r in itertools.islice(iter_transactions(conn, start, end, cursor, limit=limit + 1), limit + 1)]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1]["waktu"], rows[-1]["id"])
+    return rows, None
+
+
+def _day_bounds(start, end):
+    """(start, end) -> tanggal 'YYYY-MM-DD' untuk rollup, atau None bila tidak pas di tengah malam."""
+    bounds = []
+    for b in (start, end):
+        if b is not None and not b.endswith(" 00:00:00"):
+            return None
+        bounds.append(b[:10] if b is not None else None)
+    return tuple(bounds)
+
+
+def _rollup_where(start, end):
+    days = _day_bounds(start, end)
+    if days is None:
+        return None
+    clauses, params = [], []
+    if days[0] is not None:
+        clauses.append("tanggal >= ?")
+        params.append(days[0])
+    if days[1] is not None:
+        clauses.append("tanggal < ?")
+        params.append(days[1])
+    return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+def summary(conn, start=None, end=None):
+    """Total porsi terjual, total pendapatan dan jumlah transaksi dalam periode."""
+    cur = conn.cursor()
+    rollup_where = _rollup_where(start, end)
+    if rollup_where is not None:
+        where, params = rollup_where
+        cur.execute(f"""
+            SELECT COALESCE(SUM(jumlah_transaksi), 0) AS jumlah_transaksi,
+                   COALESCE(SUM(total_terjual), 0) AS total_terjual,
+                   COALESCE(SUM(total_pendapatan), 0) AS total_pendapatan
+            FROM daily_sales{where}
+        """, params)
+        return dict(cur.fetchone())
+
+    clauses, params = waktu_filter(start, end)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    transaksi, _ = arsip.sumber(conn, start)
+    cur.execute(f"""
+        SELECT COUNT(*) AS jumlah_transaksi,
+               COALESCE(SUM(t.jumlah), 0) AS total_terjual,
+               COALESCE(SUM(t.total_harga), 0) AS total_pendapatan
+        FROM {transaksi} t{where}
+    """, params)
+    return dict(cur.fetchone())
+
+
+def product_sales(conn, start=None, end=None):
+    """Jumlah terjual per produk (menu + topping, topping dihitung per porsi)."""
+    cur = conn.cursor()
+    rollup_where = _rollup_where(start, end)
+    if rollup_where is not None:
+        where, params = rollup_where
+        cur.execute(f"""
+            SELECT nama AS Produk, SUM(terjual) AS Terjual
+            FROM daily_product_sales{where}
+            GROUP BY nama
+            ORDER BY Terjual DESC, nama
+        """, params)
+        return [dict(r) for r in cur.fetchall()]
+
+    clauses, params = waktu_filter(start, end)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    transaksi, item = arsip.sumber(conn, start)
+    cur.execute(f"""
+        SELECT i.nama AS Produk, SUM(i.jumlah) AS Terjual
+        FROM {item} i JOIN {transaksi} t ON t.id = i.transaksi_id{where}
+        GROUP BY i.nama
+        ORDER BY Terjual DESC, i.nama
+    """, params)
+    return [dict(r) for r in cur.fetchall()]
+
+
+def _daily_source(conn, start, end):
+    """Subquery berbentuk ``daily_sales`` untuk rentang [start, end).
+
+    Dibaca dari rollup bila rentangnya pas harian, selain itu diagregasi dari
+    transaksi mentah (lewat index waktu) dengan kolom yang sama.
+    """
+    rollup_where = _rollup_where(start, end)
+    if rollup_where is not None:
+        where, params = rollup_where
+        return f"(SELECT * FROM daily_sales{where})", params
+    clauses, params = waktu_filter(start, end)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    transaksi, _ = arsip.sumber(conn, start)
+    return f"""(
+        SELECT substr(t.waktu, 1, 10) AS tanggal, t.metode_pembayaran,
+               COUNT(*) AS jumlah_transaksi, SUM(t.jumlah) AS total_terjual, SUM(t.total_harga) AS total_pendapatan
+        FROM {transaksi} t{where}
+        GROUP BY substr(t.waktu, 1, 10), t.metode_pembayaran
+    )""", params
+
+
+def _hourly_source(conn, start, end):
+    """Seperti ``_daily_source`` tapi berbentuk ``hourly_sales`` (tanggal, jam)."""
+    rollup_where = _rollup_where(start, end)
+    if rollup_where is not None:
+        where, params = rollup_where
+        return f"(SELECT * FROM hourly_sales{where})", params
+    clauses, params = waktu_filter(start, end)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    transaksi, _ = arsip.sumber(conn, start)
+    return f"""(
+        SELECT substr(t.waktu, 1, 10) AS tanggal, CAST(substr(t.waktu, 12, 2) AS INTEGER) AS jam,
+               COUNT(*) AS jumlah_transaksi, SUM(t.jumlah) AS total_terjual, SUM(t.total_harga) AS total_pendapatan
+        FROM {transaksi} t{where}
+        GROUP BY substr(t.waktu, 1, 10), substr(t.waktu, 12, 2)
+    )""", params
+
+
+def sales_by_method(conn, start=None, end=None):
+    """Transaksi, porsi dan pendapatan per metode pembayaran.
+
+    Semua metode di ``METODE_PEMBAYARAN`` selalu muncul (nol bila tidak ada
+    penjualan), metode lain dari data lama menyusul di belakang.
+    """
+    source, params = _daily_source(conn, start, end)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT metode_pembayaran AS Metode,
+               SUM(jumlah_transaksi) AS Transaksi,
+               SUM(total_terjual) AS Terjual,
+               SUM(total_pendapatan) AS Pendapatan
+        FROM {source}
+        GROUP BY metode_pembayaran
+        ORDER BY Pendapatan DESC
+    """, params)
+    rows = {r["Metode"]: dict(r) for r in cur.fetchall()}
+    hasil = [rows.pop(m, {"Metode": m, "Transaksi": 0, "Terjual": 0, "Pendapatan": 0}) for m in METODE_PEMBAYARAN]
+    return hasil + list(rows.values())
+
+
+def hourly_heatmap(conn, start=None, end=None):
+    """Penjualan per (hari dalam minggu, jam) untuk heatmap; hanya sel yang ada penjualannya.
+
+    ``Hari`` memakai nama di ``HARI`` (Senin dulu), ``urut`` indeksnya di list itu.
+    """
+    source, params = _hourly_source(conn, start, end)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT (CAST(strftime('%w', tanggal) AS INTEGER) + 6) % 7 AS urut,
+               jam AS Jam,
+               SUM(jumlah_transaksi) AS Transaksi,
+               SUM(total_pendapatan) AS Pendapatan
+        FROM {source}
+        GROUP BY urut, jam
+        ORDER BY urut, jam
+    """, params)
+    return [dict(r, Hari=HARI[r["urut"]]) for r in cur.fetchall()]
+
+
+def daily_comparison(conn, start=None, end=None):
+    """Pendapatan per hari dibanding hari sebelumnya (terbaru dulu).
+
+    Hari pertama periode dibandingkan dengan hari sebelum periode, jadi
+    rentang sumber dimulai satu hari lebih awal lalu disaring lagi.
+    """
+    prev_start = None
+    if start is not None:
+        prev_start = _fmt(datetime.datetime.strptime(start[:10], "%Y-%m-%d") - datetime.timedelta(days=1))
+    source, params = _daily_source(conn, prev_start, end)
+    cur = conn.cursor()
+    cur.execute(f"""
+        WITH harian AS (
+            SELECT tanggal, SUM(jumlah_transaksi) AS transaksi, SUM(total_pendapatan) AS pendapatan
+            FROM {source}
+            GROUP BY tanggal
+        )
+        SELECT h.tanggal AS Tanggal,
+               h.transaksi AS Transaksi,
+               h.pendapatan AS Pendapatan,
+               COALESCE(p.pendapatan, 0) AS Kemarin,
+               h.pendapatan - COALESCE(p.pendapatan, 0) AS Selisih,
+               CASE WHEN p.pendapatan > 0
+                    THEN ROUND(100.0 * (h.pendapatan - p.pendapatan) / p.pendapatan, 1) END AS "Perubahan (%)"
+        FROM harian h LEFT JOIN harian p ON p.tanggal = date(h.tanggal, '-1 day')
+        WHERE h.tanggal >= ?
+        ORDER BY h.tanggal DESC
+    """, params + [start[:10] if start is not None else ""])
+    return [dict(r) for r in cur.fetchall()]
@@ -0,0 +1,109 @@
+# kasir/outlet.py
+"""Daftar outlet (satu file SQLite per outlet) dan laporan gabungan.
+
+Tiap outlet punya database sendiri, jadi pool koneksi, thread penulis, jurnal
+order dan lock write-nya juga terpisah: kasir di satu outlet tidak pernah
+menunggu lock outlet lain. Outlet pertama adalah outlet pusat; tabel users
+dan kunci token sesi dibaca dari sana.
+
+Daftar outlet diambil dari environment ``KASIR_OUTLETS``::
+
+    KASIR_OUTLETS="pusat=kasir_seblak.db,dago=kasir_dago.db"
+
+Tanpa variabel itu hanya ada satu outlet ``pusat`` di ``DB_PATH``, sama
+seperti sebelum ada multi-outlet.
+
+``konsolidasi`` menjalankan query rollup yang sama di semua outlet secara
+paralel (thread pool; sqlite3 melepas GIL selama query berjalan) lalu
+menjumlahkan hasilnya. Baris transaksi mentah tidak pernah disalin antar DB.
+"""
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from kasir import laporan
+from kasir.db import DB_PATH
+from kasir.journal import JOURNAL_PATH
+
+_KODE = re.compile(r"^[a-z0-9_-]+$")
+
+
+def parse_outlets(spec):
+    """``"kode=path,kode=path"`` -> ``{kode: path}`` (urutan dipertahankan; yang pertama = pusat)."""
+    outlets = {}
+    for bagian in filter(None, (b.strip() for b in spec.split(","))):
+        kode, sep, path = (x.strip() for x in bagian.partition("="))
+        if not sep or not path or not _KODE.match(kode):
+            raise ValueError(f"Outlet tidak valid: {bagian!r} (format: kode=path, kode huruf kecil/angka)")
+        if kode in outlets:
+            raise ValueError(f"Outlet ganda: {kode}")
+        outlets[kode] = path
+    return outlets or {"pusat": DB_PATH}
+
+
+OUTLETS = parse_outlets(os.environ.get("KASIR_OUTLETS", ""))
+PUSAT = next(iter(OUTLETS))
+
+
+def journal_path(kode):
+    """File jurnal order offline per outlet; outlet pusat tetap memakai ``JOURNAL_PATH``."""
+    return JOURNAL_PATH if kode == PUSAT else f"kasir_journal_{kode}.jsonl"
+
+
+# ----------------------------
+# LAPORAN GABUNGAN
+# ----------------------------
+def _laporan_outlet(pool, start, end):
+    with pool.connection() as conn:
+        return {
+            "ringkasan": laporan.summary(conn, start, end),
+            "metode": laporan.sales_by_method(conn, start, end),
+            "produk": laporan.product_sales(conn, start, end),
+        }
+
+
+def _jumlahkan(rows, key, kolom):
+    # urutan kemunculan pertama dipertahankan (mis. urutan METODE_PEMBAYARAN)
+    hasil = {}
+    for r in rows:
+        acc = hasil.setdefault(r[key], {key: r[key], **{k: 0 for k in kolom}})
+        for k in kolom:
+            acc[k] += r[k] or 0
+    return list(hasil.values())
+
+
+def konsolidasi(pools, start=None, end=None, max_workers=None):
+    """Laporan semua outlet dalam rentang [start, end), dijalankan paralel.
+
+    ``pools``: ``{kode: ConnectionPool}``. Mengembalikan dict berisi
+    ``per_outlet`` (satu baris per outlet), ``ringkasan``, ``metode`` dan
+    ``produk`` (gabungan), serta ``gagal`` (``{kode: pesan}``) untuk outlet
+    yang DB-nya tidak bisa dibaca; outlet lain tetap dilaporkan.
+    """
+    per_outlet, gagal = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(pools), thread_name_prefix="kasir-konsolidasi") as ex:
+        futures = {kode: ex.submit(_laporan_outlet, pool, start, end) for kode, pool in pools.items()}
+        for kode, fut in futures.items():
+            try:
+                per_outlet[kode] = fut.result()
+            except sqlite3.Error as e:
+                gagal[kode] = str(e)
+
+    ringkasan_kolom = ("jumlah_transaksi", "total_terjual", "total_pendapatan")
+    return {
+        "per_outlet": [
+            {"Outlet": kode, "Transaksi": r["ringkasan"]["jumlah_transaksi"],
+             "Terjual": r["ringkasan"]["total_terjual"], "Pendapatan": r["ringkasan"]["total_pendapatan"]}
+            for kode, r in per_outlet.items()
+        ],
+        "ringkasan": {k: sum(r["ringkasan"][k] for r in per_outlet.values()) for k in ringkasan_kolom},
+        "metode": _jumlahkan(
+            (m for r in per_outlet.values() for m in r["metode"]), "Metode", ("Transaksi", "Terjual", "Pendapatan")
+        ),
+        "produk": sorted(
+            _jumlahkan((p for r in per_outlet.values() for p in r["produk"]), "Produk", ("Terjual",)),
+            key=lambda p: (-p["Terjual"], p["Produk"]),
+        ),
+        "gagal": gagal,
+    }
@@ -0,0 +1,242 @@
+# kasir/perf.py
+"""Instrumentasi ringan untuk jalur panas: waktu, jumlah query dan baris.
+
+Mati secara default. Aktifkan dengan environment ``KASIR_PERF=1`` (atau
+``perf.enable()`` dari panel admin). Selama mati, ``timed`` hanya menambah
+satu cek boolean per pemanggilan dan ``timer`` mengembalikan context manager
+no-op yang sama, jadi biayanya praktis nol.
+
+Yang dicatat per operasi (mis. ``db.fetch_summary``, ``qr.generate_qr_bytes``,
+``chart.statistik``): jumlah panggilan, total waktu, query SQL yang dijalankan
+(lewat ``sqlite3.Connection.set_trace_callback``) dan baris yang dikembalikan.
+Selain total per proses, tiap eksekusi halaman (``run``) merangkum
+operasinya sendiri dan disimpan di ``recent_runs()``.
+
+Keluaran opsional:
+
+- ``KASIR_PERF_LOG=perf.jsonl``: satu baris JSON per eksekusi halaman
+- ``KASIR_PERF_PROM=kasir.prom``: file teks format Prometheus (untuk
+  textfile collector node_exporter), ditulis ulang paling sering sekali per detik
+"""
+import contextlib
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+_enabled = os.environ.get("KASIR_PERF", "") not in ("", "0")
+LOG_PATH = os.environ.get("KASIR_PERF_LOG")
+PROM_PATH = os.environ.get("KASIR_PERF_PROM")
+PROM_INTERVAL = 1.0
+
+_NOOP = contextlib.nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+_totals = {}                 # nama -> [calls, detik, queries, rows]
+_runs = deque(maxlen=50)
+_prom_written = 0.0
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+        _runs.clear()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _rows(result):
+    # (rows, next_cursor) dari fetch_transactions_page
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        result = result[0]
+    return len(result) if isinstance(result, list) else 0
+
+
+# ----------------------------
+# PENCATATAN
+# ----------------------------
+class _Timer:
+    __slots__ = ("name", "queries", "rows", "_t0")
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.rows = 0
+
+    def __enter__(self):
+        _stack().append(self)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._t0
+        _stack().pop()
+        _record(self.name, elapsed, self.queries, self.rows)
+        return False
+
+
+def _record(name, elapsed, queries, rows):
+    with _lock:
+        t = _totals.setdefault(name, [0, 0.0, 0, 0])
+        t[0] += 1
+        t[1] += elapsed
+        t[2] += queries
+        t[3] += rows
+    run = getattr(_local, "run", None)
+    if run is not None:
+        r = run.setdefault(name, [0, 0.0, 0, 0])
+        r[0] += 1
+        r[1] += elapsed
+        r[2] += queries
+        r[3] += rows
+
+
+def timer(name):
+    """Context manager untuk blok kode, mis. ``with perf.timer("chart.statistik"):``."""
+    return _Timer(name) if _enabled else _NOOP
+
+
+def timed(kind):
+    """Decorator: catat fungsi sebagai ``"<kind>.<nama fungsi>"``; baris dihitung dari hasil list."""
+    def deco(fn):
+        name = f"{kind}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name) as t:
+                result = fn(*args, **kwargs)
+                t.rows = _rows(result)
+            return result
+        return wrapper
+    return deco
+
+
+def count_query(statement):
+    """Trace callback sqlite3: tambahkan satu query ke operasi terdalam yang sedang berjalan."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].queries += 1
+
+
+@contextlib.contextmanager
+def traced(conn):
+    """Hitung query di ``conn`` selama blok berjalan (hanya bila instrumentasi aktif)."""
+    if not _enabled:
+        yield conn
+        return
+    conn.set_trace_callback(count_query)
+    try:
+        yield conn
+    finally:
+        conn.set_trace_callback(None)
+
+
+# ----------------------------
+# PER EKSEKUSI HALAMAN
+# ----------------------------
+def run(name):
+    """Decorator halaman: rangkum semua operasi di dalamnya sebagai satu eksekusi."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            _local.run = {}
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _finish_run(name, time.perf_counter() - t0, _local.run)
+                _local.run = None
+        return wrapper
+    return deco
+
+
+def _finish_run(name, elapsed, ops):
+    entry = {
+        "waktu": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "halaman": name,
+        "total_ms": round(elapsed * 1000, 3),
+        "queries": sum(o[2] for o in ops.values()),
+        "ops": {
+            op: {"calls": c, "ms": round(s * 1000, 3), "queries": q, "rows": r}
+            for op, (c, s, q, r) in sorted(ops.items(), key=lambda kv: -kv[1][1])
+        },
+    }
+    with _lock:
+        _runs.append(entry)
+    if LOG_PATH:
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    if PROM_PATH:
+        _maybe_write_prometheus(PROM_PATH)
+
+
+def recent_runs():
+    """Eksekusi halaman terakhir (terbaru dulu), dari semua sesi di proses ini."""
+    with _lock:
+        return list(reversed(_runs))
+
+
+def totals():
+    """Total per operasi sejak proses mulai (atau ``reset()``), yang paling lama dulu."""
+    with _lock:
+        items = sorted(_totals.items(), key=lambda kv: -kv[1][1])
+    return [
+        {"operasi": op, "calls": c, "total_ms": round(s * 1000, 3),
+         "avg_ms": round(s * 1000 / c, 3) if c else 0.0, "queries": q, "rows": r}
+        for op, (c, s, q, r) in items
+    ]
+
+
+# ----------------------------
+# PROMETHEUS
+# ----------------------------
+def render_prometheus():
+    """Total per operasi dalam format teks eksposisi Prometheus."""
+    with _lock:
+        items = sorted((op, list(v)) for op, v in _totals.items())
+    lines = []
+    for idx, (metric, help_text) in enumerate([
+        ("kasir_op_calls_total", "Jumlah pemanggilan per operasi"),
+        ("kasir_op_seconds_total", "Total waktu per operasi (detik)"),
+        ("kasir_op_queries_total", "Query SQL yang dijalankan per operasi"),
+        ("kasir_op_rows_total", "Baris yang dikembalikan per operasi"),
+    ]):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for op, values in items:
+            lines.append(f'{metric}{{op="{op}"}} {values[idx]}')
+    return "\n".join(lines) + "\n"
+
+
+def _maybe_write_prometheus(path):
+    global _prom_written
+    now = time.monotonic()
+    with _lock:
+        if now - _prom_written < PROM_INTERVAL:
+            return
+        _prom_written = now
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)  # atomik: collector tidak pernah membaca file setengah jadi
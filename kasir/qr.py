@@ -0,0 +1,70 @@
+# kasir/qr.py
+"""Render QR code dengan cache LRU terbatas.
+
+Link pembayaran tetap (OVO/Gopay/Dana/QRIS) cukup di-render sekali per
+proses. Payload dinamis (mis. QRIS per transaksi yang memuat nominal) ikut
+masuk cache yang sama, tapi jumlah entrinya dibatasi ``maxsize`` sehingga
+memori tidak tumbuh tanpa batas.
+"""
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+
+def render_qr(data, box_size=8, border=2, fmt="PNG"):
+    """Render ``data`` jadi gambar QR (bytes) dalam format PIL ``fmt``."""
+    import qrcode
+
+    qr = qrcode.QRCode(box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buf = BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+class QRCache:
+    """Cache LRU thread-safe: key (payload, box_size, border, format) -> bytes gambar."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, data, box_size=8, border=2, fmt="PNG"):
+        key = (data, box_size, border, fmt.upper())
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+                self._hits += 1
+                return img
+            self._misses += 1
+        # render di luar lock; dua thread bisa me-render key yang sama, hasilnya identik
+        img = render_qr(data, box_size, border, fmt)
+        with self._lock:
+            self._items[key] = img
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self._evictions += 1
+        return img
+
+    def warm(self, payloads, **kwargs):
+        """Pre-render payload tetap (mis. link pembayaran) saat startup."""
+        for data in payloads:
+            self.get(data, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,143 @@
+# kasir/rollup.py
+"""Tabel ringkasan harian yang dijaga tetap sinkron secara inkremental.
+
+- ``daily_sales``         : per (tanggal, metode_pembayaran)
+- ``daily_product_sales`` : per (tanggal, nama produk)
+- ``hourly_sales``        : per (tanggal, jam), untuk heatmap penjualan per jam
+
+Setiap penjualan meng-upsert rollup di transaksi DB yang sama (lihat
+``apply_sale``), jadi laporan periode apa pun cukup membaca beberapa ratus
+baris ringkasan. ``rebuild`` menghitung ulang dari data mentah untuk backfill.
+
+CLI::
+
+    python -m kasir.rollup --db kasir_seblak.db [--dari 2025-01-01] [--sampai 2025-02-01]
+"""
+import sqlite3
+from collections import defaultdict
+
+from kasir import arsip
+from kasir.db import DB_PATH, ConnectionPool
+from kasir.schema import migrate
+
+
+def apply_sale(cur, waktu, metode_pembayaran, lines):
+    """Tambahkan baris-baris penjualan (CartLine) ke rollup harian. Tanpa commit."""
+    tanggal = waktu[:10]
+    cur.execute("""
+        INSERT INTO daily_sales (tanggal, metode_pembayaran, jumlah_transaksi, total_terjual, total_pendapatan)
+        VALUES (?,?,?,?,?)
+        ON CONFLICT (tanggal, metode_pembayaran) DO UPDATE SET
+            jumlah_transaksi = jumlah_transaksi + excluded.jumlah_transaksi,
+            total_terjual = total_terjual + excluded.total_terjual,
+            total_pendapatan = total_pendapatan + excluded.total_pendapatan
+    """, (
+        tanggal, metode_pembayaran, len(lines),
+        sum(line.jumlah for line in lines), sum(line.total_harga for line in lines),
+    ))
+
+    cur.execute("""
+        INSERT INTO hourly_sales (tanggal, jam, jumlah_transaksi, total_terjual, total_pendapatan)
+        VALUES (?,?,?,?,?)
+        ON CONFLICT (tanggal, jam) DO UPDATE SET
+            jumlah_transaksi = jumlah_transaksi + excluded.jumlah_transaksi,
+            total_terjual = total_terjual + excluded.total_terjual,
+            total_pendapatan = total_pendapatan + excluded.total_pendapatan
+    """, (
+        tanggal, int(waktu[11:13]), len(lines),
+        sum(line.jumlah for line in lines), sum(line.total_harga for line in lines),
+    ))
+
+    terjual = defaultdict(int)
+    tipe = {}
+    for line in lines:
+        terjual[line.menu] += line.jumlah
+        tipe[line.menu] = "menu"
+        for t in line.toppings:
+            terjual[t] += line.jumlah
+            tipe.setdefault(t, "topping")
+    cur.executemany("""
+        INSERT INTO daily_product_sales (tanggal, nama, tipe, terjual) VALUES (?,?,?,?)
+        ON CONFLICT (tanggal, nama) DO UPDATE SET terjual = terjual + excluded.terjual
+    """, [(tanggal, nama, tipe[nama], qty) for nama, qty in terjual.items()])
+
+
+def _day_where(dari, sampai, column):
+    clauses, params = [], []
+    if dari is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(dari)
+    if sampai is not None:
+        clauses.append(f"{column} < ?")
+        params.append(sampai)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def fill(cur, dari=None, sampai=None):
+    """Hapus lalu isi ulang rollup tanggal [dari, sampai) ('YYYY-MM-DD') dari data mentah.
+
+    Tanpa commit. Mengembalikan jumlah baris daily_sales yang ditulis.
+    """
+    roll_where, roll_params = _day_where(dari, sampai, "tanggal")
+    # batas tanggal dipakai langsung ke waktu: '2025-02-01' < '2025-02-01 00:00:00'
+    raw_where, raw_params = _day_where(dari, sampai, "t.waktu")
+    # bulan yang sudah diarsip tetap dihitung ulang dari tabel arsipnya
+    transaksi, item = arsip.sumber(cur, f"{dari} 00:00:00" if dari is not None else None)
+    cur.execute("DELETE FROM daily_sales" + roll_where, roll_params)
+    cur.execute("DELETE FROM daily_product_sales" + roll_where, roll_params)
+    cur.execute("DELETE FROM hourly_sales" + roll_where, roll_params)
+    cur.execute(f"""
+        INSERT INTO daily_sales (tanggal, metode_pembayaran, jumlah_transaksi, total_terjual, total_pendapatan)
+        SELECT substr(t.waktu, 1, 10), t.metode_pembayaran, COUNT(*), SUM(t.jumlah), SUM(t.total_harga)
+        FROM {transaksi} t{raw_where}
+        GROUP BY substr(t.waktu, 1, 10), t.metode_pembayaran
+    """, raw_params)
+    written = cur.rowcount
+    cur.execute(f"""
+        INSERT INTO hourly_sales (tanggal, jam, jumlah_transaksi, total_terjual, total_pendapatan)
+        SELECT substr(t.waktu, 1, 10), CAST(substr(t.waktu, 12, 2) AS INTEGER),
+               COUNT(*), SUM(t.jumlah), SUM(t.total_harga)
+        FROM {transaksi} t{raw_where}
+        GROUP BY substr(t.waktu, 1, 10), substr(t.waktu, 12, 2)
+    """, raw_params)
+    cur.execute(f"""
+        INSERT INTO daily_product_sales (tanggal, nama, tipe, terjual)
+        SELECT substr(t.waktu, 1, 10), i.nama, MIN(i.tipe), SUM(i.jumlah)
+        FROM {item} i JOIN {transaksi} t ON t.id = i.transaksi_id{raw_where}
+        GROUP BY substr(t.waktu, 1, 10), i.nama
+    """, raw_params)
+    return written
+
+
+def rebuild(conn, dari=None, sampai=None):
+    """``fill`` di dalam satu transaksi write (BEGIN IMMEDIATE)."""
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        written = fill(cur, dari, sampai)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return written
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild tabel rollup penjualan harian.")
+    parser.add_argument("--db", default=DB_PATH, help="path file SQLite")
+    parser.add_argument("--dari", help="tanggal awal (YYYY-MM-DD), inklusif")
+    parser.add_argument("--sampai", help="tanggal akhir (YYYY-MM-DD), eksklusif")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.db, size=1)
+    with pool.connection() as conn:
+        migrate(conn)
+        n = rebuild(conn, args.dari, args.sampai)
+    pool.close_all()
+    print(f"{n} baris daily_sales ditulis ulang")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# kasir/schema.py
+"""Skema database + migrasi berversi (PRAGMA user_version).
+
+Setiap migrasi hanya dijalankan sekali per file DB, berurutan, di dalam
+satu transaksi write bersama dengan kenaikan ``user_version``.
+"""
+
+
+def _v1_base(cur):
+    # products table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS produk (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nama TEXT UNIQUE,
+        tipe TEXT,
+        harga INTEGER,
+        stok INTEGER
+    )
+    """)
+    # transaksi table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS transaksi (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        waktu TEXT,
+        menu TEXT,
+        toppings TEXT,
+        jumlah INTEGER,
+        metode_pembayaran TEXT,
+        total_harga INTEGER
+    )
+    """)
+    # users table (simple)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        password_hash TEXT,
+        role TEXT
+    )
+    """)
+
+
+def _v2_pesanan(cur):
+    # header pesanan; baris-barisnya tetap di tabel transaksi (satu baris per menu)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS pesanan (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        waktu TEXT,
+        metode_pembayaran TEXT,
+        jumlah_baris INTEGER,
+        total_harga INTEGER
+    )
+    """)
+    cur.execute("ALTER TABLE transaksi ADD COLUMN pesanan_id INTEGER REFERENCES pesanan(id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_pesanan ON transaksi(pesanan_id)")
+
+
+def _v3_transaksi_item(cur):
+    # satu baris per produk per transaksi (menu + tiap topping), ganti string topping dipisah koma
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS transaksi_item (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaksi_id INTEGER NOT NULL REFERENCES transaksi(id) ON DELETE CASCADE,
+        product_id INTEGER REFERENCES produk(id) ON DELETE SET NULL,
+        nama TEXT NOT NULL,
+        tipe TEXT NOT NULL,
+        jumlah INTEGER NOT NULL,
+        harga INTEGER
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_item_transaksi ON transaksi_item(transaksi_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_item_product ON transaksi_item(product_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_item_nama ON transaksi_item(nama, jumlah)")
+
+    # migrasi satu kali data lama; harga satuan historis tidak diketahui -> NULL
+    cur.execute("""
+        INSERT INTO transaksi_item (transaksi_id, product_id, nama, tipe, jumlah)
+        SELECT t.id, p.id, t.menu, 'menu', t.jumlah
+        FROM transaksi t LEFT JOIN produk p ON p.nama = t.menu
+    """)
+    product_ids = {r[0]: r[1] for r in cur.execute("SELECT nama, id FROM produk").fetchall()}
+    items = []
+    for trx_id, toppings, jumlah in cur.execute(
+        "SELECT id, toppings, jumlah FROM transaksi WHERE toppings IS NOT NULL AND toppings != ''"
+    ).fetchall():
+        for top in toppings.split(","):
+            if top:
+                items.append((trx_id, product_ids.get(top), top, "topping", jumlah))
+    cur.executemany(
+        "INSERT INTO transaksi_item (transaksi_id, product_id, nama, tipe, jumlah) VALUES (?,?,?,?,?)", items
+    )
+
+
+def _v4_index_waktu(cur):
+    # range query (waktu >= ? AND waktu < ?) + urutan waktu DESC, id DESC (id ikut di index sebagai rowid)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transaksi_waktu ON transaksi(waktu)")
+
+
+def _v5_rollup(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS daily_sales (
+        tanggal TEXT NOT NULL,
+        metode_pembayaran TEXT NOT NULL,
+        jumlah_transaksi INTEGER NOT NULL,
+        total_terjual INTEGER NOT NULL,
+        total_pendapatan INTEGER NOT NULL,
+        PRIMARY KEY (tanggal, metode_pembayaran)
+    ) WITHOUT ROWID
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS daily_product_sales (
+        tanggal TEXT NOT NULL,
+        nama TEXT NOT NULL,
+        tipe TEXT NOT NULL,
+        terjual INTEGER NOT NULL,
+        PRIMARY KEY (tanggal, nama)
+    ) WITHOUT ROWID
+    """)
+    # backfill dikerjakan di _v6: fill() sekarang juga mengisi hourly_sales
+
+
+def _v6_hourly(cur):
+    from kasir.rollup import fill
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS hourly_sales (
+        tanggal TEXT NOT NULL,
+        jam INTEGER NOT NULL,
+        jumlah_transaksi INTEGER NOT NULL,
+        total_terjual INTEGER NOT NULL,
+        total_pendapatan INTEGER NOT NULL,
+        PRIMARY KEY (tanggal, jam)
+    ) WITHOUT ROWID
+    """)
+    # backfill semua rollup dari transaksi yang sudah ada
+    fill(cur)
+
+
+def _v7_sesi(cur):
+    # versi sesi per user: dinaikkan saat password/role berubah -> token sesi lama gugur
+    cur.execute("ALTER TABLE users ADD COLUMN sesi_versi INTEGER NOT NULL DEFAULT 0")
+    # kunci rahasia penanda tangan token sesi, dll.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS app_config (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """)
+
+
+def _v8_stok_ledger(cur):
+    # tanpa FK ke produk: riwayat stok tetap ada untuk audit walau produknya dihapus
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS stok_movement (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        waktu TEXT NOT NULL,
+        delta INTEGER NOT NULL,
+        alasan TEXT NOT NULL CHECK (alasan IN ('sale', 'restock', 'correction')),
+        ref_id INTEGER,
+        catatan TEXT
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stok_movement_produk_waktu ON stok_movement(product_id, waktu)")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS stok_snapshot (
+        product_id INTEGER NOT NULL,
+        waktu TEXT NOT NULL,
+        stok INTEGER NOT NULL,
+        movement_id INTEGER NOT NULL,
+        PRIMARY KEY (product_id, waktu)
+    ) WITHOUT ROWID
+    """)
+    # saldo awal: stok saat migrasi (riwayat sebelumnya tidak diketahui)
+    cur.execute("""
+    INSERT OR IGNORE INTO stok_snapshot (product_id, waktu, stok, movement_id)
+    SELECT id, datetime('now', 'localtime'), stok, 0 FROM produk
+    """)
+
+
+def _v9_idempotency(cur):
+    # key dari jurnal order offline (kasir/journal.py): pesanan yang sama tidak pernah diterapkan dua kali
+    cur.execute("ALTER TABLE pesanan ADD COLUMN idempotency_key TEXT")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_pesanan_idempotency ON pesanan(idempotency_key)")
+
+
+def _v10_user_outlet(cur):
+    # outlet tempat user boleh login (kasir/outlet.py); NULL = semua outlet
+    cur.execute("ALTER TABLE users ADD COLUMN outlet TEXT")
+
+
+def _v11_arsip(cur):
+    from kasir.arsip import buat_view
+
+    # view gabungan partisi panas + arsip bulanan (kasir/arsip.py); belum ada arsip = tabel panas saja
+    buat_view(cur)
+
+
+def _v12_sesi_server(cur):
+    # sesi yang masih aktif (id acak di dalam token); logout menghapus barisnya -> token di URL gugur
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sesi (
+        id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        outlet TEXT,
+        exp INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sesi_username ON sesi(username)")
+
+
+MIGRATIONS = [
+    (1, _v1_base),
+    (2, _v2_pesanan),
+    (3, _v3_transaksi_item),
+    (4, _v4_index_waktu),
+    (5, _v5_rollup),
+    (6, _v6_hourly),
+    (7, _v7_sesi),
+    (8, _v8_stok_ledger),
+    (9, _v9_idempotency),
+    (10, _v10_user_outlet),
+    (11, _v11_arsip),
+    (12, _v12_sesi_server),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """Bawa skema DB ke ``SCHEMA_VERSION``. Mengembalikan versi sebelum migrasi.
+
+    Skema yang sudah terkini hanya dibaca (tanpa lock write), jadi aman
+    dipanggil sambil thread penulis outlet itu sedang commit.
+    """
+    cur = conn.cursor()
+    current = cur.execute("PRAGMA user_version").fetchone()[0]
+    if current >= SCHEMA_VERSION:
+        return current
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        current = cur.execute("PRAGMA user_version").fetchone()[0]
+        for version, step in MIGRATIONS:
+            if version > current:
+                step(cur)
+        if current < SCHEMA_VERSION:
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return current
@@ -0,0 +1,783 @@
+# kasir/service.py
+"""Lapisan layanan (tanpa UI): helper DB, logika bisnis dan auth yang dipakai app.py.
+
+Tidak mengimpor streamlit, pandas, numpy atau qrcode di level modul, jadi modul ini bisa
+diimpor dalam hitungan milidetik oleh app.py, CLI, benchmark maupun skrip lain.
+Objek per proses (pool koneksi, katalog produk, cache QR, token sesi) dibuat sekali lewat
+``functools.cache``; yang terikat ke satu database (pool, penulis, jurnal, katalog)
+dibuat sekali per outlet (kasir/outlet.py).
+"""
+import atexit
+import datetime
+import functools
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+from kasir import arsip, auth, export, laporan, perf, rollup, stok
+from kasir.cart import Cart, CartLine
+from kasir.catalog import ProductCatalog
+from kasir.db import ConnectionPool
+from kasir.journal import JournalSync, OrderJournal
+from kasir.outlet import OUTLETS, PUSAT, journal_path, konsolidasi
+from kasir.qr import QRCache
+from kasir.schema import migrate
+from kasir.transaksi import insert_lines
+from kasir.writer import WriteBehindWriter
+
+# Ganti link berikut dengan link/ID pembayaran resmi merchantmu
+LINK_OVO   = "https://contoh-link-ovo.com/pay"
+LINK_GOPAY = "https://contoh-link-gopay.com/pay"
+LINK_DANA  = "https://contoh-link-dana.com/pay"
+LINK_QRIS  = "https://contoh-link-qris.com/pay"
+
+STOK_COMPACT_INTERVAL = datetime.timedelta(days=1)
+ARSIP_INTERVAL = datetime.timedelta(days=1)
+EXPORT_TTL = datetime.timedelta(hours=1)
+MAINTENANCE_CHECK = datetime.timedelta(hours=1)
+
+
+# ----------------------------
+# OUTLET
+# ----------------------------
+_sesi = threading.local()
+
+
+def use_outlet(kode):
+    """Arahkan helper DB di thread ini ke outlet ``kode`` (app.py: outlet sesi yang login)."""
+    if kode not in OUTLETS:
+        raise ValueError(f"Outlet tidak dikenal: {kode}")
+    _sesi.outlet = kode
+
+
+def current_outlet():
+    return getattr(_sesi, "outlet", PUSAT)
+
+
+# ----------------------------
+# HELPERS: DB, QR, AUTH
+# Objek per DB dibuat sekali per outlet; tanpa argumen ``outlet`` dipakai
+# outlet sesi yang sedang berjalan (``use_outlet``).
+# ----------------------------
+@functools.cache
+def _pool(outlet):
+    return ConnectionPool(OUTLETS[outlet])
+
+
+def get_pool(outlet=None):
+    """Satu pool koneksi per outlet per proses, dipakai bersama oleh semua sesi/thread."""
+    return _pool(outlet or current_outlet())
+
+
+@functools.cache
+def _writer(outlet):
+    writer = WriteBehindWriter(OUTLETS[outlet], on_commit=get_catalog(outlet).set_stock)
+    atexit.register(writer.close)
+    return writer
+
+
+def get_writer(outlet=None):
+    """Satu thread penulis per outlet untuk semua checkout; lihat kasir/writer.py."""
+    return _writer(outlet or current_outlet())
+
+
+@functools.cache
+def _journal(outlet):
+    journal = OrderJournal(journal_path(outlet))
+    atexit.register(journal.close)
+    return journal
+
+
+def get_journal(outlet=None):
+    """Jurnal order lokal per outlet; lihat kasir/journal.py."""
+    return _journal(outlet or current_outlet())
+
+
+@functools.cache
+def _journal_sync(outlet):
+    sync = JournalSync(get_journal(outlet), get_writer(outlet))
+    # sisa dari proses sebelumnya diputar dulu sampai habis, baru thread latar mengambil alih
+    sync.drain()
+    sync.start()
+    atexit.register(sync.close)
+    return sync
+
+
+def get_journal_sync(outlet=None):
+    """Sinkronisasi latar jurnal -> DB; langsung memutar ulang sisa dari proses sebelumnya."""
+    return _journal_sync(outlet or current_outlet())
+
+
+@contextmanager
+def get_db_connection(outlet=None):
+    """Pinjam koneksi dari pool (dikembalikan otomatis); query dihitung bila perf aktif."""
+    with get_pool(outlet).connection() as conn, perf.traced(conn):
+        yield conn
+
+
+@functools.cache
+def init_db():
+    """Buat database & tabel semua outlet bila belum ada, plus sample data & users (di outlet pusat).
+
+    Sekali per proses (bukan per sesi Streamlit): sesi baru di satu outlet
+    tidak menyentuh lock write database outlet lain.
+    """
+    for outlet in OUTLETS:
+        with get_db_connection(outlet) as conn:
+            migrate(conn)
+            cur = conn.cursor()
+            # insert sample products bila tabel kosong
+            cur.execute("SELECT COUNT(*) as c FROM produk")
+            if cur.fetchone()["c"] == 0:
+                sample = [
+                    ("Seblak Original","menu",15000,50),
+                    ("Seblak Kerupuk","menu",12000,40),
+                    ("Seblak Ceker","menu",18000,30),
+                    ("Seblak Makaroni","menu",16000,35),
+                    ("Kerupuk","topping",3000,100),
+                    ("Ceker","topping",5000,50),
+                    ("Makaroni","topping",4000,60),
+                    ("Sosis","topping",5000,40),
+                    ("Telur","topping",4000,30),
+                ]
+                cur.executemany("INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)", sample)
+                conn.commit()
+
+        # sisa jurnal dari proses sebelumnya (crash/restart) diputar ulang dulu:
+        # mutasi stoknya bertanggal lampau dan harus sudah ada sebelum snapshot stok
+        get_journal_sync(outlet)
+
+    with get_db_connection(PUSAT) as conn:
+        cur = conn.cursor()
+        # insert default users bila kosong (username: admin / kasir, password: admin123 / kasir123)
+        cur.execute("SELECT COUNT(*) as c FROM users")
+        if cur.fetchone()["c"] == 0:
+            users = [
+                ("admin", auth.hash_password("admin123"), "admin"),
+                ("kasir", auth.hash_password("kasir123"), "kasir")
+            ]
+            cur.executemany("INSERT INTO users (username, password_hash, role) VALUES (?,?,?)", users)
+            conn.commit()
+
+        # kunci penanda tangan token sesi, dibuat sekali per database
+        cur.execute(
+            "INSERT OR IGNORE INTO app_config (key, value) VALUES ('session_secret', ?)", (secrets.token_hex(32),)
+        )
+        conn.commit()
+
+    # QR link pembayaran di-render sekarang, bukan saat checkout pertama
+    get_qr_cache()
+    run_maintenance(paksa=True)
+
+
+_maintenance_lock = threading.Lock()
+_maintenance_berikut = 0.0
+
+
+def run_maintenance(paksa=False):
+    """Snapshot stok dan arsip yang sudah jatuh tempo (sekali sehari) di semua outlet.
+
+    Dipanggil tiap sesi baru (app.py) supaya proses yang hidup berhari-hari
+    tetap merawat database-nya, tapi database baru dicek paling sering sekali
+    per ``MAINTENANCE_CHECK`` per proses; yang tidak jatuh tempo hanya dibaca.
+    """
+    global _maintenance_berikut
+    with _maintenance_lock:
+        sekarang = time.monotonic()
+        if not paksa and sekarang < _maintenance_berikut:
+            return
+        _maintenance_berikut = sekarang + MAINTENANCE_CHECK.total_seconds()
+
+    for outlet in OUTLETS:
+        with get_db_connection(outlet) as conn:
+            # snapshot stok berkala supaya rekonstruksi stok lampau tetap murah
+            batas = (datetime.datetime.now() - STOK_COMPACT_INTERVAL).strftime("%Y-%m-%d %H:%M:%S")
+            terakhir = stok.last_compaction(conn)
+            if terakhir is None or terakhir < batas:
+                stok.compact(conn)
+
+            # arsip bulan yang sudah ditutup + ANALYZE/VACUUM, sekali sehari
+            batas = (datetime.datetime.now() - ARSIP_INTERVAL).strftime("%Y-%m-%d %H:%M:%S")
+            terakhir = arsip.terakhir(conn)
+            if terakhir is None or terakhir < batas:
+                _archive_later(outlet)
+
+
+@functools.cache
+def get_qr_cache():
+    """Cache QR per proses; link pembayaran di-render saat startup (dipanggil dari ``init_db``)."""
+    cache = QRCache()
+    cache.warm([LINK_OVO, LINK_GOPAY, LINK_DANA, LINK_QRIS])
+    return cache
+
+
+@perf.timed("qr")
+def generate_qr_bytes(data: str):
+    return BytesIO(get_qr_cache().get(data))
+
+
+# ----------------------------
+# DB OPERATIONS
+# ----------------------------
+@perf.timed("db")
+def _load_products(outlet):
+    with get_db_connection(outlet) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM produk ORDER BY tipe, nama")
+        return cur.fetchall()
+
+
+@functools.cache
+def _catalog(outlet):
+    return ProductCatalog(functools.partial(_load_products, outlet))
+
+
+def get_catalog(outlet=None):
+    """Cache katalog produk per outlet; lihat kasir/catalog.py."""
+    return _catalog(outlet or current_outlet())
+
+
+@perf.timed("db")
+def fetch_products():
+    return [dict(p) for p in get_catalog().products()]
+
+
+@perf.timed("db")
+def get_product_by_name(nama):
+    row = get_catalog().get(nama)
+    return dict(row) if row else None
+
+
+@perf.timed("db")
+def add_product_db(nama, tipe, harga, stok_awal):
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)", (nama, tipe, harga, stok_awal))
+            stok.open_product(cur, cur.lastrowid, stok_awal)
+            conn.commit()
+            get_catalog().invalidate()
+            return True, None
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            return False, str(e)
+
+
+@perf.timed("db")
+def update_stock_db(nama, delta, alasan=None, catatan=None):
+    """delta negatif untuk mengurangi, positif untuk tambah; dicatat di ledger stok"""
+    with get_db_connection() as conn:
+        ok, info = stok.adjust(conn, nama, delta, alasan, catatan)
+    if not ok:
+        return False, info
+    # invalidate, bukan set_stock: lock write sudah dilepas, jadi nilai ``info``
+    # bisa lebih tua dari penjualan yang commit sesudahnya
+    get_catalog().invalidate()
+    return True, None
+
+
+@perf.timed("db")
+def fetch_stock_movements(product_id, limit=100, cursor=None):
+    with get_db_connection() as conn:
+        return stok.movements(conn, product_id, limit, cursor)
+
+
+@perf.timed("db")
+def fetch_stock_at(product_id, waktu):
+    with get_db_connection() as conn:
+        return stok.stock_at(conn, product_id, waktu)
+
+
+@perf.timed("db")
+def fetch_stock_drift():
+    with get_db_connection() as conn:
+        return stok.drift(conn)
+
+
+@perf.timed("db")
+def compact_stock_ledger(buang_sebelum=None):
+    with get_db_connection() as conn:
+        return stok.compact(conn, buang_sebelum)
+
+
+@functools.cache
+def _demand_model(outlet):
+    from kasir import forecast  # lazy: numpy hanya dimuat saat prakiraan dibutuhkan
+    return forecast.DemandModel()
+
+
+def get_demand_model(outlet=None):
+    """Model prakiraan permintaan per outlet; lihat kasir/forecast.py."""
+    return _demand_model(outlet or current_outlet())
+
+
+@perf.timed("db")
+def fetch_stock_forecast():
+    """Prakiraan habis stok + saran restock untuk semua produk (model di-refresh inkremental)."""
+    model = get_demand_model()
+    with get_db_connection() as conn:
+        model.refresh(conn)
+    return model.predict(get_catalog().products())
+
+
+@perf.timed("db")
+def delete_product_db(nama):
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM produk WHERE nama = ?", (nama,))
+        conn.commit()
+    get_catalog().invalidate()
+    return True
+
+
+@perf.timed("db")
+def record_transaction_db(waktu, menu, toppings, jumlah, metode_pembayaran, total_harga):
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        insert_lines(cur, waktu, metode_pembayaran, [CartLine(menu, tuple(toppings), jumlah, total_harga)])
+        conn.commit()
+
+
+@perf.timed("db")
+def fetch_transactions(month_prefix=None, start=None, end=None):
+    """Transaksi dalam rentang [start, end); month_prefix 'YYYY-MM' = satu bulan penuh."""
+    if month_prefix:
+        start, end = laporan.month_bounds(month_prefix)
+    with get_db_connection() as conn:
+        return laporan.fetch_transactions(conn, start, end)
+
+
+@perf.timed("db")
+def fetch_transactions_page(start=None, end=None, cursor=None, limit=laporan.PAGE_SIZE):
+    with get_db_connection() as conn:
+        return laporan.fetch_transactions_page(conn, start, end, cursor, limit)
+
+
+@perf.timed("db")
+def fetch_months():
+    with get_db_connection() as conn:
+        return laporan.list_months(conn)
+
+
+@perf.timed("db")
+def fetch_summary(start=None, end=None):
+    with get_db_connection() as conn:
+        return laporan.summary(conn, start, end)
+
+
+@perf.timed("db")
+def fetch_sales_by_method(start=None, end=None):
+    with get_db_connection() as conn:
+        return laporan.sales_by_method(conn, start, end)
+
+
+@perf.timed("db")
+def fetch_hourly_heatmap(start=None, end=None):
+    with get_db_connection() as conn:
+        return laporan.hourly_heatmap(conn, start, end)
+
+
+@perf.timed("db")
+def fetch_daily_comparison(start=None, end=None):
+    with get_db_connection() as conn:
+        return laporan.daily_comparison(conn, start, end)
+
+
+_EXPORT_PREFIX = "kasir_laporan_"
+_export_files = set()     # file export milik proses ini, dihapus saat proses berhenti
+
+
+def discard_export(path):
+    """Hapus file export yang sudah dikirim ke browser (atau tidak dipakai lagi)."""
+    _export_files.discard(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _sweep_exports(semua=False):
+    """Hapus file export yang lebih tua dari ``EXPORT_TTL`` (sesi yang sudah berakhir), atau semua."""
+    import glob
+    import tempfile
+
+    batas = time.time() - EXPORT_TTL.total_seconds()
+    paths = list(_export_files) if semua else glob.glob(os.path.join(tempfile.gettempdir(), f"{_EXPORT_PREFIX}*"))
+    for path in paths:
+        try:
+            if semua or os.path.getmtime(path) < batas:
+                discard_export(path)
+        except OSError:
+            pass
+
+
+atexit.register(_sweep_exports, semua=True)
+
+
+@perf.timed("db")
+def export_laporan(start=None, end=None, fmt="csv"):
+    """Tulis laporan periode ke file sementara secara streaming; kembalikan path-nya.
+
+    Pemanggil menghapusnya lewat ``discard_export`` sesudah dikirim; file
+    yang tertinggal (sesi ditutup sebelum download) dibersihkan di export
+    berikutnya sesudah ``EXPORT_TTL``.
+    """
+    import tempfile
+
+    _sweep_exports()
+    fd, path = tempfile.mkstemp(prefix=_EXPORT_PREFIX, suffix=f".{fmt}")
+    _export_files.add(path)
+    try:
+        with get_db_connection() as conn:
+            if fmt == "parquet":
+                os.close(fd)
+                export.write_parquet(conn, path, start, end)
+            else:
+                with os.fdopen(fd, "wb") as f:
+                    export.write_csv(conn, f, start, end)
+    except Exception:
+        discard_export(path)
+        raise
+    return path
+
+
+@perf.timed("db")
+def fetch_product_sales(start=None, end=None):
+    with get_db_connection() as conn:
+        return laporan.product_sales(conn, start, end)
+
+
+@perf.timed("db")
+def fetch_data_version():
+    with get_db_connection() as conn:
+        return laporan.data_version(conn)
+
+
+@perf.timed("db")
+def fetch_konsolidasi(start=None, end=None):
+    """Laporan gabungan semua outlet, di-query paralel dari rollup tiap outlet; lihat kasir/outlet.py."""
+    return konsolidasi({outlet: get_pool(outlet) for outlet in OUTLETS}, start, end)
+
+
+@functools.cache
+def _arsip_lock(outlet):
+    return threading.Lock()
+
+
+def _archive_later(outlet):
+    """Jalankan pengarsipan di thread latar supaya startup tidak menunggu (satu job per outlet)."""
+    def run():
+        lock = _arsip_lock(outlet)
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            with get_db_connection(outlet) as conn:
+                arsip.jalankan(conn)
+        except sqlite3.Error:
+            pass  # mis. DB sibuk saat VACUUM; dicoba lagi saat sesi berikutnya dimulai
+        finally:
+            lock.release()
+
+    threading.Thread(target=run, name=f"kasir-arsip-{outlet}", daemon=True).start()
+
+
+@perf.timed("db")
+def archive_transactions(simpan_bulan=arsip.SIMPAN_BULAN, vacuum=None):
+    """Arsipkan bulan yang sudah ditutup; lihat kasir/arsip.py."""
+    with _arsip_lock(current_outlet()), get_db_connection() as conn:
+        return arsip.jalankan(conn, simpan_bulan, vacuum)
+
+
+@perf.timed("db")
+def fetch_db_size():
+    with get_db_connection() as conn:
+        return arsip.ukuran(conn)
+
+
+@perf.timed("db")
+def rebuild_rollups():
+    """Hitung ulang daily_sales & daily_product_sales dari transaksi mentah."""
+    with get_db_connection() as conn:
+        hasil = rollup.rebuild(conn)
+    if _demand_model.cache_info().currsize:
+        get_demand_model().reset()
+    return hasil
+
+
+# ----------------------------
+# BUSINESS LOGIC
+# ----------------------------
+@perf.timed("bisnis")
+def safe_process_transaction(menu, toppings, jumlah, metode_pembayaran, total_harga):
+    """
+    Antrekan penjualan satu baris ke thread penulis dan tunggu hasilnya. Di sana stok
+    menu + semua topping dicek dalam satu query lalu dikurangi dengan satu UPDATE
+    bersyarat; jika ada yang kurang, kembalikan False tanpa mengubah DB.
+
+    Sama seperti ``checkout``: info = (pesanan_id, waktu) bila berhasil;
+    ``pesanan_id`` None berarti DB sedang tidak bisa ditulis dan penjualan
+    baru tersimpan di jurnal offline.
+    """
+    cart = Cart()
+    cart.add(menu, toppings, jumlah, total_harga)
+    return checkout(cart, metode_pembayaran)
+
+
+@perf.timed("bisnis")
+def checkout(cart, metode_pembayaran):
+    """Checkout keranjang multi-baris; info = (pesanan_id, waktu) bila berhasil.
+
+    Pesanan dicatat dulu di jurnal lokal. Bila DB sedang tidak bisa ditulis,
+    penjualan tetap diterima dengan ``pesanan_id`` None dan disinkronkan nanti
+    oleh ``get_journal_sync()``. Katalog produk sudah diperbarui oleh thread
+    penulis sebelum hasilnya kembali.
+    """
+    if not cart.lines:
+        return False, "Keranjang kosong."
+    journal = get_journal()
+    entry = journal.append(cart, metode_pembayaran)
+    try:
+        ok, info, _ = get_writer().checkout(cart, metode_pembayaran, entry["key"], entry["waktu"])
+    except sqlite3.Error:
+        journal.release(entry["key"])
+        get_journal_sync().wake()
+        return True, (None, entry["waktu"])
+    journal.resolve([(entry["key"], ok, info)])
+    return ok, info
+
+
+# ----------------------------
+# AUTH
+# ----------------------------
+ROLES = ["admin", "kasir"]
+
+
+@functools.cache
+def get_session_tokens():
+    """Penanda tangan token sesi per proses; kunci dari KASIR_SECRET_KEY atau app_config."""
+    secret = os.environ.get("KASIR_SECRET_KEY")
+    if not secret:
+        with get_db_connection(PUSAT) as conn:
+            row = conn.execute("SELECT value FROM app_config WHERE key = 'session_secret'").fetchone()
+        secret = row["value"]
+    return auth.SessionTokens(secret)
+
+
+@functools.cache
+def _sesi_versi():
+    """{username: (sesi_versi, role)}; dibaca sekali, dibuang tiap kali data user berubah."""
+    with get_db_connection(PUSAT) as conn:
+        return {
+            r["username"]: (r["sesi_versi"], r["role"])
+            for r in conn.execute("SELECT username, sesi_versi, role FROM users")
+        }
+
+
+def _versi_baru(cur):
+    """Versi sesi berikutnya dari penghitung global di app_config.
+
+    Tidak pernah terulang, juga untuk user yang dihapus lalu dibuat lagi
+    dengan nama yang sama, jadi token lama tidak pernah cocok lagi.
+    """
+    return int(cur.execute("""
+        INSERT INTO app_config (key, value)
+        VALUES ('sesi_versi_terakhir', (SELECT COALESCE(MAX(sesi_versi), 0) + 1 FROM users))
+        ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        RETURNING value
+    """).fetchone()[0])
+
+
+def _user_changed(username):
+    _sesi_versi.cache_clear()
+    get_session_tokens().forget(username=username)
+
+
+def _rehash_later(username, password, old_hash):
+    """Upgrade hash lama di thread latar supaya login tidak menunggu biaya hash baru."""
+    def run():
+        new_hash = auth.hash_password(password)
+        with get_db_connection(PUSAT) as conn:
+            # hanya bila hash belum diganti orang lain sementara itu
+            conn.execute(
+                "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                (new_hash, username, old_hash),
+            )
+            conn.commit()
+
+    threading.Thread(target=run, name="kasir-rehash", daemon=True).start()
+
+
+@perf.timed("bisnis")
+def attempt_login(username, password, outlet=PUSAT):
+    with get_db_connection(PUSAT) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT password_hash, role, outlet FROM users WHERE username = ?", (username,))
+        row = cur.fetchone()
+    if not row:
+        return False, "User tidak ditemukan"
+    if auth.verify_password(password, row["password_hash"]):
+        if auth.needs_rehash(row["password_hash"]):
+            _rehash_later(username, password, row["password_hash"])
+        if row["outlet"] is not None and row["outlet"] != outlet:
+            return False, f"User {username} hanya bisa login di outlet {row['outlet']}"
+        return True, row["role"]
+    return False, "Password salah"
+
+
+def start_session(username, role, outlet=PUSAT):
+    """Token sesi bertanda tangan untuk user yang baru login (disimpan di session_state oleh app.py).
+
+    Outlet ikut ditandatangani, jadi sesi terkunci ke satu outlet sampai logout.
+    """
+    versi, _ = _sesi_versi().get(username, (0, role))
+    token, payload = get_session_tokens().issue(username, role, versi, outlet)
+    with get_db_connection(PUSAT) as conn:
+        # sesi yang sudah kedaluwarsa ikut dibersihkan di sini
+        conn.execute("DELETE FROM sesi WHERE exp <= ?", (int(time.time()),))
+        conn.execute(
+            "INSERT INTO sesi (id, username, outlet, exp) VALUES (?,?,?,?)",
+            (payload["s"], username, outlet, payload["exp"]),
+        )
+        conn.commit()
+    return token
+
+
+def resume_session(token):
+    """(username, role, outlet) dari token sesi yang sah, tanpa memeriksa password lagi; selain itu None.
+
+    Token harus bertanda tangan sah dan id sesinya masih tercatat di tabel
+    ``sesi`` (belum logout), jadi token yang sudah logout tidak bisa dipakai
+    lagi. Role diambil dari DB, bukan dari token.
+    """
+    payload = get_session_tokens().verify(token)
+    if payload is None or "s" not in payload:
+        return None
+    versi, role = _sesi_versi().get(payload["u"], (None, None))
+    if versi != payload["v"]:
+        return None
+    outlet = payload.get("o", PUSAT)  # token dari sebelum multi-outlet
+    if outlet not in OUTLETS:
+        return None
+    with get_db_connection(PUSAT) as conn:
+        row = conn.execute("SELECT username FROM sesi WHERE id = ?", (payload["s"],)).fetchone()
+    if row is None or row["username"] != payload["u"]:
+        return None
+    return payload["u"], role, outlet
+
+
+def end_session(token):
+    """Logout: hapus sesi di server, jadi token yang sama tidak bisa di-resume lagi."""
+    tokens = get_session_tokens()
+    payload = tokens.verify(token)
+    tokens.forget(token)
+    if payload is not None and "s" in payload:
+        with get_db_connection(PUSAT) as conn:
+            conn.execute("DELETE FROM sesi WHERE id = ?", (payload["s"],))
+            conn.commit()
+
+
+@perf.timed("db")
+def fetch_users():
+    with get_db_connection(PUSAT) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT username, role, outlet FROM users ORDER BY username")
+        rows = cur.fetchall()
+    return [dict(r) for r in rows]
+
+
+def _admin_count(cur):
+    return cur.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'").fetchone()[0]
+
+
+@perf.timed("db")
+def add_user_db(username, password, role, outlet=None):
+    """``outlet`` None = user boleh login di semua outlet."""
+    if role not in ROLES:
+        return False, f"Role tidak dikenal: {role}"
+    if outlet is not None and outlet not in OUTLETS:
+        return False, f"Outlet tidak dikenal: {outlet}"
+    pwd_hash = auth.hash_password(password)
+    with get_db_connection(PUSAT) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(
+                "INSERT INTO users (username, password_hash, role, outlet, sesi_versi) VALUES (?,?,?,?,?)",
+                (username, pwd_hash, role, outlet, _versi_baru(cur)),
+            )
+            # sisa sesi user lama dengan nama yang sama (kalau ada) tidak ikut berlaku
+            cur.execute("DELETE FROM sesi WHERE username = ?", (username,))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False, f"User {username} sudah ada"
+    _user_changed(username)
+    return True, None
+
+
+@perf.timed("db")
+def set_password_db(username, password):
+    """Ganti password; semua sesi user itu ikut gugur."""
+    pwd_hash = auth.hash_password(password)
+    with get_db_connection(PUSAT) as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(
+            "UPDATE users SET password_hash = ?, sesi_versi = ? WHERE username = ?",
+            (pwd_hash, _versi_baru(cur), username),
+        )
+        if cur.rowcount == 0:
+            conn.rollback()
+            return False, "User tidak ditemukan"
+        cur.execute("DELETE FROM sesi WHERE username = ?", (username,))
+        conn.commit()
+    _user_changed(username)
+    return True, None
+
+
+@perf.timed("db")
+def set_role_db(username, role):
+    if role not in ROLES:
+        return False, f"Role tidak dikenal: {role}"
+    with get_db_connection(PUSAT) as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        row = cur.execute("SELECT role FROM users WHERE username = ?", (username,)).fetchone()
+        if not row:
+            conn.rollback()
+            return False, "User tidak ditemukan"
+        if row["role"] == "admin" and role != "admin" and _admin_count(cur) <= 1:
+            conn.rollback()
+            return False, "Minimal harus ada satu admin"
+        cur.execute("UPDATE users SET role = ?, sesi_versi = ? WHERE username = ?", (role, _versi_baru(cur), username))
+        cur.execute("DELETE FROM sesi WHERE username = ?", (username,))
+        conn.commit()
+    _user_changed(username)
+    return True, None
+
+
+@perf.timed("db")
+def delete_user_db(username):
+    with get_db_connection(PUSAT) as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        row = cur.execute("SELECT role FROM users WHERE username = ?", (username,)).fetchone()
+        if not row:
+            conn.rollback()
+            return False, "User tidak ditemukan"
+        if row["role"] == "admin" and _admin_count(cur) <= 1:
+            conn.rollback()
+            return False, "Minimal harus ada satu admin"
+        cur.execute("DELETE FROM users WHERE username = ?", (username,))
+        cur.execute("DELETE FROM sesi WHERE username = ?", (username,))
+        # penghitung versi tetap maju, jadi user baru dengan nama yang sama tidak mewarisi versi lama
+        _versi_baru(cur)
+        conn.commit()
+    _user_changed(username)
+    return True, None
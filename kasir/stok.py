@@ -0,0 +1,220 @@
+# kasir/stok.py
+"""Buku besar stok: setiap perubahan stok dicatat sebagai mutasi (append-only).
+
+- ``stok_movement`` : satu baris per mutasi (delta + alasan), ditulis di
+  transaksi DB yang sama dengan perubahan ``produk.stok``
+- ``stok_snapshot`` : stok per produk pada satu titik (mutasi terakhir yang
+  sudah terhitung = ``movement_id``), dibuat oleh ``compact``
+
+``produk.stok`` tetap kolom stok terkini (dibaca O(1)); ledger dipakai untuk
+audit dan untuk merekonstruksi stok di waktu lampau: snapshot terakhir
+sebelum waktu itu + jumlah delta sesudahnya, lewat index (product_id, waktu).
+Karena ``compact`` membuat snapshot berkala, rekonstruksi hanya menjumlah
+mutasi satu interval berapa pun panjang ledger-nya.
+
+CLI::
+
+    python -m kasir.stok compact [--buang-sebelum 2025-01-01]
+    python -m kasir.stok cek
+"""
+import datetime
+import sqlite3
+
+from kasir.db import DB_PATH, ConnectionPool
+from kasir.schema import migrate
+
+ALASAN = ("sale", "restock", "correction")
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def record(cur, movements, alasan, waktu=None, ref_id=None, catatan=None):
+    """Tulis mutasi ``[(product_id, delta), ...]`` ke ledger. Tanpa commit."""
+    if alasan not in ALASAN:
+        raise ValueError(f"Alasan mutasi tidak dikenal: {alasan}")
+    waktu = waktu or _now()
+    cur.executemany(
+        "INSERT INTO stok_movement (product_id, waktu, delta, alasan, ref_id, catatan) VALUES (?,?,?,?,?,?)",
+        [(pid, waktu, delta, alasan, ref_id, catatan) for pid, delta in movements if delta],
+    )
+
+
+def open_product(cur, product_id, stok, waktu=None):
+    """Saldo awal produk baru: snapshot 0 lalu mutasi restock sebesar stok awal. Tanpa commit."""
+    waktu = waktu or _now()
+    last_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM stok_movement").fetchone()[0]
+    cur.execute(
+        "INSERT OR REPLACE INTO stok_snapshot (product_id, waktu, stok, movement_id) VALUES (?,?,0,?)",
+        (product_id, waktu, last_id),
+    )
+    record(cur, [(product_id, stok)], "restock", waktu, catatan="stok awal")
+
+
+def adjust(conn, nama, delta, alasan=None, catatan=None):
+    """Tambah/kurangi stok satu produk + catat mutasinya secara atomik.
+
+    ``alasan`` default: ``restock`` untuk delta positif, ``correction`` untuk
+    negatif. Mengembalikan ``(True, stok_baru)`` atau ``(False, pesan)``.
+    """
+    alasan = alasan or ("restock" if delta > 0 else "correction")
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        row = cur.execute("SELECT id, stok FROM produk WHERE nama = ?", (nama,)).fetchone()
+        if not row:
+            conn.rollback()
+            return False, "Produk tidak ditemukan"
+        if row["stok"] + delta < 0:
+            conn.rollback()
+            return False, "Stok tidak cukup"
+        cur.execute("UPDATE produk SET stok = stok + ? WHERE id = ?", (delta, row["id"]))
+        record(cur, [(row["id"], delta)], alasan, catatan=catatan)
+        conn.commit()
+        return True, row["stok"] + delta
+    except (sqlite3.Error, ValueError) as e:
+        conn.rollback()
+        return False, str(e)
+
+
+# ----------------------------
+# RIWAYAT & REKONSTRUKSI
+# ----------------------------
+def movements(conn, product_id, limit=100, cursor=None):
+    """Mutasi satu produk, terbaru dulu, per halaman (keyset ``(waktu, id)``)."""
+    params = [product_id]
+    where = "product_id = ?"
+    if cursor is not None:
+        where += " AND (waktu, id) < (?, ?)"
+        params.extend(cursor)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT id, waktu, delta, alasan, ref_id, catatan FROM stok_movement
+        WHERE {where} ORDER BY waktu DESC, id DESC LIMIT ?
+    """, params + [limit])
+    return [dict(r) for r in cur.fetchall()]
+
+
+def stock_at(conn, product_id, waktu):
+    """Stok produk pada ``waktu`` ("YYYY-MM-DD HH:MM:SS", inklusif), atau None bila sebelum catatan pertama."""
+    cur = conn.cursor()
+    snap = cur.execute("""
+        SELECT waktu, stok, movement_id FROM stok_snapshot
+        WHERE product_id = ? AND waktu <= ?
+        ORDER BY waktu DESC LIMIT 1
+    """, (product_id, waktu)).fetchone()
+    if snap is None:
+        return None
+    # batas bawah lewat id, bukan waktu: mutasi dari jurnal offline yang baru tersinkron
+    # bertanggal sebelum snapshot tapi belum terhitung di dalamnya
+    delta = cur.execute("""
+        SELECT COALESCE(SUM(delta), 0) FROM stok_movement
+        WHERE product_id = ? AND id > ? AND waktu <= ?
+    """, (product_id, snap["movement_id"], waktu)).fetchone()[0]
+    return snap["stok"] + delta
+
+
+def drift(conn):
+    """Produk yang ``produk.stok``-nya tidak sama dengan snapshot + mutasi sesudahnya.
+
+    Selisih di sini berarti ada perubahan stok yang tidak lewat ledger.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        WITH terakhir AS (
+            SELECT s.product_id, s.stok, s.movement_id FROM stok_snapshot s
+            WHERE s.waktu = (SELECT MAX(waktu) FROM stok_snapshot WHERE product_id = s.product_id)
+        )
+        SELECT p.id, p.nama, p.stok AS stok_produk,
+               t.stok + COALESCE((SELECT SUM(m.delta) FROM stok_movement m
+                                   WHERE m.product_id = p.id AND m.id > t.movement_id), 0) AS stok_ledger
+        FROM produk p LEFT JOIN terakhir t ON t.product_id = p.id
+    """)
+    return [dict(r) for r in cur.fetchall() if r["stok_produk"] != r["stok_ledger"]]
+
+
+# ----------------------------
+# KOMPAKSI
+# ----------------------------
+def compact(conn, buang_sebelum=None):
+    """Snapshot stok semua produk saat ini; opsional buang mutasi lama.
+
+    Dengan ``buang_sebelum`` ("YYYY-MM-DD"), mutasi sebelum tanggal itu
+    dihapus, tapi hanya untuk produk yang punya snapshot di/ sesudah tanggal
+    itu, sehingga stok terkini dan rekonstruksi sejak snapshot tetap benar.
+    Mengembalikan ``(jumlah_snapshot, jumlah_mutasi_dibuang)``.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        waktu = _now()
+        last_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM stok_movement").fetchone()[0]
+        cur.execute("""
+            INSERT OR REPLACE INTO stok_snapshot (product_id, waktu, stok, movement_id)
+            SELECT id, ?, stok, ? FROM produk
+        """, (waktu, last_id))
+        n_snap = cur.rowcount
+        n_buang = 0
+        if buang_sebelum is not None:
+            # hanya mutasi yang sudah terhitung di snapshot itu (id <= movement_id)
+            cur.execute("""
+                DELETE FROM stok_movement
+                WHERE waktu < ? AND id <= (
+                    SELECT MIN(s.movement_id) FROM stok_snapshot s
+                    WHERE s.product_id = stok_movement.product_id AND s.waktu >= ?
+                )
+            """, (buang_sebelum, buang_sebelum))
+            n_buang = cur.rowcount
+            # snapshot sebelum batas tidak bisa dipakai lagi (mutasi sesudahnya sudah dibuang)
+            cur.execute("""
+                DELETE FROM stok_snapshot
+                WHERE waktu < ? AND product_id IN (
+                    SELECT product_id FROM stok_snapshot WHERE waktu >= ?
+                )
+            """, (buang_sebelum, buang_sebelum))
+        # dicatat terpisah: open_product juga menulis stok_snapshot (produk baru)
+        cur.execute("INSERT OR REPLACE INTO app_config (key, value) VALUES ('stok_compact_terakhir', ?)", (waktu,))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return n_snap, n_buang
+
+
+def last_compaction(conn):
+    row = conn.execute("SELECT value FROM app_config WHERE key = 'stok_compact_terakhir'").fetchone()
+    return row[0] if row else None
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Perawatan ledger stok.")
+    parser.add_argument("--db", default=DB_PATH, help="path file SQLite")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_compact = sub.add_parser("compact", help="snapshot stok semua produk (jalankan berkala, mis. cron harian)")
+    p_compact.add_argument("--buang-sebelum", help="hapus mutasi sebelum tanggal ini (YYYY-MM-DD)")
+    sub.add_parser("cek", help="bandingkan produk.stok dengan ledger")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.db, size=1)
+    try:
+        with pool.connection() as conn:
+            migrate(conn)
+            if args.perintah == "compact":
+                n_snap, n_buang = compact(conn, args.buang_sebelum)
+                print(f"{n_snap} snapshot ditulis, {n_buang} mutasi dibuang")
+            else:
+                selisih = drift(conn)
+                for d in selisih:
+                    print(f"{d['nama']}: produk.stok={d['stok_produk']} ledger={d['stok_ledger']}")
+                print(f"{len(selisih)} produk tidak cocok")
+                return 1 if selisih else 0
+    finally:
+        pool.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
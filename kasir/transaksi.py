@@ -0,0 +1,153 @@
+# kasir/transaksi.py
+"""Proses penjualan: cek & kurangi stok secara set-based dalam satu transaksi DB."""
+import datetime
+import sqlite3
+
+from kasir import rollup, stok
+from kasir.cart import Cart
+
+
+def _placeholders(n):
+    return ",".join("?" * n)
+
+
+def reserve_stock(cur, need, labels=None):
+    """Kurangi stok semua produk di ``need`` dengan satu SELECT + satu UPDATE.
+
+    Harus dipanggil di dalam transaksi write (BEGIN IMMEDIATE). Mengembalikan
+    ``(True, {nama: {"id", "harga", "stok"}})`` dengan stok sesudah dikurangi,
+    atau ``(False, pesan)``; pada kegagalan belum ada baris yang berubah
+    kecuali pemanggil sendiri yang rollback.
+    """
+    labels = labels or {}
+    names = list(need)
+    cur.execute(f"SELECT id, nama, harga, stok FROM produk WHERE nama IN ({_placeholders(len(names))})", names)
+    produk = {r["nama"]: dict(r) for r in cur.fetchall()}
+    for nama in names:
+        label = labels.get(nama, "Produk")
+        if nama not in produk:
+            return False, f"{label} {nama} tidak ditemukan."
+        if produk[nama]["stok"] < need[nama]:
+            return False, f"Stok {nama} tidak mencukupi."
+
+    # satu UPDATE bersyarat untuk semua produk; rowcount < jumlah produk -> ada yang kurang
+    case_sql = "CASE nama " + " ".join("WHEN ? THEN ?" for _ in names) + " END"
+    case_params = [v for nama in names for v in (nama, need[nama])]
+    cur.execute(
+        f"UPDATE produk SET stok = stok - {case_sql} "
+        f"WHERE nama IN ({_placeholders(len(names))}) AND stok >= {case_sql}",
+        case_params + names + case_params,
+    )
+    if cur.rowcount != len(names):
+        return False, "Stok tidak mencukupi."
+    for nama in names:
+        produk[nama]["stok"] -= need[nama]
+    return True, produk
+
+
+def insert_lines(cur, waktu, metode_pembayaran, lines, pesanan_id=None, produk=None):
+    """Tulis baris transaksi + item per produk (transaksi_item) dengan executemany,
+    dan perbarui rollup harian di transaksi DB yang sama.
+
+    ``produk`` ({nama: {"id", "harga"}}) boleh diisi bila sudah dibaca
+    sebelumnya; bila tidak, dibaca dengan satu query.
+    """
+    if produk is None:
+        names = list({n for line in lines for n in (line.menu, *line.toppings)})
+        cur.execute(f"SELECT id, nama, harga FROM produk WHERE nama IN ({_placeholders(len(names))})", names)
+        produk = {r["nama"]: dict(r) for r in cur.fetchall()}
+
+    cur.executemany("""
+        INSERT INTO transaksi (waktu, menu, toppings, jumlah, metode_pembayaran, total_harga, pesanan_id)
+        VALUES (?,?,?,?,?,?,?)
+    """, [
+        (waktu, line.menu, ",".join(line.toppings), line.jumlah, metode_pembayaran, line.total_harga, pesanan_id)
+        for line in lines
+    ])
+    # dipanggil di dalam transaksi write, jadi id AUTOINCREMENT batch ini berurutan
+    last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+    trx_ids = list(range(last_id - len(lines) + 1, last_id + 1))
+
+    items = []
+    for trx_id, line in zip(trx_ids, lines):
+        for nama, tipe in [(line.menu, "menu")] + [(t, "topping") for t in line.toppings]:
+            p = produk.get(nama) or {}
+            items.append((trx_id, p.get("id"), nama, tipe, line.jumlah, p.get("harga")))
+    cur.executemany(
+        "INSERT INTO transaksi_item (transaksi_id, product_id, nama, tipe, jumlah, harga) VALUES (?,?,?,?,?,?)",
+        items,
+    )
+    rollup.apply_sale(cur, waktu, metode_pembayaran, lines)
+    return trx_ids
+
+
+def apply_checkout(cur, cart, metode_pembayaran, key=None, waktu=None):
+    """Isi ``checkout_cart`` tanpa BEGIN/COMMIT, untuk pemanggil yang sudah memegang lock write.
+
+    ``key`` adalah idempotency key: pesanan dengan key yang sudah tercatat
+    tidak diterapkan lagi, hasilnya pesanan yang lama (stok_baru kosong).
+    ``waktu`` dipakai untuk penjualan yang diputar ulang dari jurnal.
+    Mengembalikan ``(True, (pesanan_id, waktu), {nama: stok_baru})`` atau
+    ``(False, pesan, None)``; pada kegagalan pemanggil wajib rollback (atau
+    ROLLBACK TO savepoint) karena UPDATE stok bisa sudah berjalan sebagian.
+    """
+    if not cart.lines:
+        return False, "Keranjang kosong.", None
+    if key is not None:
+        row = cur.execute("SELECT id, waktu FROM pesanan WHERE idempotency_key = ?", (key,)).fetchone()
+        if row is not None:
+            return True, (row["id"], row["waktu"]), {}
+    need = cart.stock_needs()
+    ok, produk = reserve_stock(cur, need, cart.labels())
+    if not ok:
+        return False, produk, None
+
+    waktu = waktu or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur.execute(
+        "INSERT INTO pesanan (waktu, metode_pembayaran, jumlah_baris, total_harga, idempotency_key) VALUES (?,?,?,?,?)",
+        (waktu, metode_pembayaran, len(cart.lines), cart.total_harga, key),
+    )
+    pesanan_id = cur.lastrowid
+    insert_lines(cur, waktu, metode_pembayaran, cart.lines, pesanan_id, produk)
+    stok.record(cur, [(produk[nama]["id"], -qty) for nama, qty in need.items()], "sale", waktu, pesanan_id)
+    return True, (pesanan_id, waktu), {nama: p["stok"] for nama, p in produk.items()}
+
+
+def checkout_cart(conn, cart, metode_pembayaran):
+    """Commit seluruh isi keranjang secara atomik dalam satu transaksi DB.
+
+    Stok diagregasi per produk (satu UPDATE untuk semua baris), header ditulis
+    ke ``pesanan``, baris-barisnya ke ``transaksi``, item per produk ke
+    ``transaksi_item`` dan mutasi stok (alasan ``sale``) ke ``stok_movement``.
+    Mengembalikan ``(True, (pesanan_id, waktu), {nama: stok_baru})`` atau
+    ``(False, pesan, None)`` tanpa perubahan apa pun di DB.
+    """
+    if not cart.lines:
+        return False, "Keranjang kosong.", None
+    cur = conn.cursor()
+    try:
+        # kunci write dulu, baru cek stok -> dua kasir tidak bisa lolos cek yang sama
+        cur.execute("BEGIN IMMEDIATE")
+        result = apply_checkout(cur, cart, metode_pembayaran)
+        if result[0]:
+            conn.commit()
+        else:
+            conn.rollback()
+        return result
+    except sqlite3.Error as e:
+        conn.rollback()
+        return False, str(e), None
+
+
+def process_sale(conn, menu, toppings, jumlah, metode_pembayaran, total_harga):
+    """Catat satu penjualan (keranjang satu baris) secara atomik.
+
+    Mengembalikan ``(True, waktu, {nama: stok_baru})`` bila berhasil, atau
+    ``(False, pesan, None)`` tanpa perubahan apa pun di DB.
+    """
+    cart = Cart()
+    cart.add(menu, toppings, jumlah, total_harga)
+    ok, info, stok_baru = checkout_cart(conn, cart, metode_pembayaran)
+    if ok:
+        info = info[1]
+    return ok, info, stok_baru
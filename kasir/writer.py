@@ -0,0 +1,212 @@
+# kasir/writer.py
+"""Penulis tunggal (write-behind) untuk checkout.
+
+Semua sesi Streamlit memasukkan perintah checkout ke satu antrean; satu
+thread latar memegang koneksi write dan mengerjakannya. Pesanan yang
+menumpuk selama commit sebelumnya berjalan digabung ke satu transaksi
+(group commit): satu BEGIN IMMEDIATE + satu COMMIT (fsync WAL) untuk
+banyak pesanan, dan tidak ada lagi beberapa koneksi yang berebut lock write
+sampai "database is locked".
+
+Kebenaran stok tetap terjaga: pesanan dalam satu batch dikerjakan
+berurutan di transaksi yang sama, masing-masing di dalam SAVEPOINT. Pesanan
+yang stoknya kurang di-ROLLBACK TO savepoint-nya sendiri tanpa menggagalkan
+pesanan lain di batch itu. Future baru selesai sesudah COMMIT, jadi kasir
+hanya melihat "berhasil" untuk pesanan yang sudah tersimpan.
+
+Pemanggil menerima ``concurrent.futures.Future`` berisi hasil yang sama
+dengan ``transaksi.checkout_cart``, kecuali error SQLite (mis. DB terkunci)
+yang dilempar sebagai exception lewat Future supaya bisa dibedakan dari
+penolakan bisnis (stok kurang)::
+
+    writer = WriteBehindWriter("kasir_seblak.db", on_commit=catalog.set_stock)
+    ok, info, stok_baru = writer.submit(cart, "Tunai").result()
+"""
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from kasir.db import connect
+from kasir.transaksi import apply_checkout
+
+_STOP = object()
+
+
+class WriterClosed(RuntimeError):
+    """Writer sudah ditutup; checkout tidak bisa diantrekan lagi."""
+
+
+class WriteBehindWriter:
+    """Satu thread penulis + antrean checkout dengan group commit.
+
+    - ``max_batch``: jumlah pesanan maksimum per transaksi DB
+    - ``linger``   : detik menunggu pesanan tambahan sebelum commit (0 = hanya
+      gabungkan yang sudah antre; batch tetap membesar sendiri saat ramai)
+    - ``on_commit``: dipanggil di thread penulis dengan ``{nama: stok}`` sesudah
+      tiap commit, sebelum future diselesaikan (mis. ``ProductCatalog.set_stock``)
+    """
+
+    def __init__(self, path, max_batch=64, linger=0.0, max_queue=1000, on_commit=None, pragmas=None):
+        self.path = path
+        self.max_batch = max_batch
+        self.linger = linger
+        self.on_commit = on_commit
+        self.pragmas = pragmas
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._submitted = 0
+        self._committed = 0
+        self._rejected = 0
+        self._batches = 0
+        self._batch_last = 0
+        self._batch_max = 0
+        self._queue_max = 0
+        self._commit_time = 0.0
+        self._commit_max = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._closed:
+                raise WriterClosed("Writer sudah ditutup")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="kasir-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, cart, metode_pembayaran, key=None, waktu=None):
+        """Antrekan checkout; kembalikan Future berisi ``(ok, info, stok_baru)``.
+
+        ``key`` (idempotency key) dan ``waktu`` diteruskan ke ``apply_checkout``.
+        """
+        self.start()
+        fut = Future()
+        # antrean penuh -> pemanggil ikut menunggu (backpressure), bukan memori tumbuh
+        self._queue.put((cart, metode_pembayaran, key, waktu, fut))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._submitted += 1
+            self._queue_max = max(self._queue_max, depth)
+        return fut
+
+    def checkout(self, cart, metode_pembayaran, key=None, waktu=None):
+        return self.submit(cart, metode_pembayaran, key, waktu).result()
+
+    def close(self, timeout=10.0):
+        """Selesaikan antrean yang tersisa lalu hentikan thread penulis."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    # ----------------------------
+    # THREAD PENULIS
+    # ----------------------------
+    def _next_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        conn = None
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch, stop = self._next_batch(item)
+                batch = [b for b in batch if b[-1].set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                if conn is None:
+                    # dibuka saat dibutuhkan: file DB yang belum bisa dibuka tidak mematikan thread
+                    try:
+                        conn = connect(self.path, self.pragmas)
+                    except sqlite3.Error as e:
+                        for b in batch:
+                            b[-1].set_exception(e)
+                        continue
+                self._commit_batch(conn, batch)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _commit_batch(self, conn, batch):
+        cur = conn.cursor()
+        results = []
+        stok = {}
+        t0 = time.perf_counter()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for cart, metode_pembayaran, key, waktu, _ in batch:
+                cur.execute("SAVEPOINT pesanan")
+                try:
+                    result = apply_checkout(cur, cart, metode_pembayaran, key, waktu)
+                except sqlite3.Error as e:
+                    result = e
+                if isinstance(result, tuple) and result[0]:
+                    stok.update(result[2])
+                else:
+                    cur.execute("ROLLBACK TO pesanan")
+                cur.execute("RELEASE pesanan")
+                results.append(result)
+            conn.commit()
+        except Exception as e:
+            # gagal di level batch (mis. lock/IO): tidak ada yang ter-commit
+            if conn.in_transaction:
+                conn.rollback()
+            results = [e] * len(batch)
+            stok = {}
+        elapsed = time.perf_counter() - t0
+
+        committed = sum(1 for r in results if isinstance(r, tuple) and r[0])
+        with self._lock:
+            self._batches += 1
+            self._batch_last = len(batch)
+            self._batch_max = max(self._batch_max, len(batch))
+            self._committed += committed
+            self._rejected += len(batch) - committed
+            self._commit_time += elapsed
+            self._commit_max = max(self._commit_max, elapsed)
+        if stok and self.on_commit is not None:
+            try:
+                self.on_commit(stok)
+            except Exception:
+                # data di DB sudah benar; jangan sampai cache yang gagal mematikan thread penulis
+                pass
+        for item, result in zip(batch, results):
+            if isinstance(result, Exception):
+                item[-1].set_exception(result)
+            else:
+                item[-1].set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "queue_depth": self._queue.qsize(),
+                "queue_depth_max": self._queue_max,
+                "submitted": self._submitted,
+                "committed": self._committed,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "batch_size_last": self._batch_last,
+                "batch_size_max": self._batch_max,
+                "batch_size_avg": round((self._committed + self._rejected) / self._batches, 2) if self._batches else 0.0,
+                "commit_time_total_ms": round(self._commit_time * 1000, 3),
+                "commit_time_max_ms": round(self._commit_max * 1000, 3),
+            }
@@ -0,0 +1,153 @@
+# tests/test_arsip.py
+"""Arsip bulanan transaksi (kasir/arsip.py): hasil laporan tidak boleh berubah.
+
+Beberapa bulan dipindah ke tabel arsip; semua laporan (rollup maupun baris
+mentah), daftar bulan, halaman transaksi, export dan rollup yang dihitung
+ulang harus sama persis dengan sebelum pengarsipan. Penjualan yang masuk
+terlambat ke bulan yang sudah diarsip (mis. jurnal offline) tetap terbaca
+dan ikut dipindah oleh pengarsipan berikutnya.
+"""
+import datetime
+import os
+import random
+import tempfile
+import unittest
+
+from kasir import arsip, export, laporan, rollup, stok
+from kasir.cart import Cart
+from kasir.db import connect
+from kasir.schema import migrate
+from kasir.transaksi import apply_checkout
+
+SEKARANG = datetime.datetime(2026, 6, 15, 12, 0, 0)
+MULAI = datetime.datetime(2025, 10, 1)
+SIMPAN_BULAN = 1          # 2026-05 dan 2026-06 tetap panas, 2025-10 .. 2026-04 diarsip
+METODE = ["Tunai", "QRIS", "E-Wallet (OVO)"]
+MENU = ["Seblak Original", "Seblak Ceker"]
+TOPPING = ["Kerupuk", "Telur", "Sosis"]
+
+
+def _jual(conn, waktu, menu, toppings, jumlah, metode):
+    cart = Cart()
+    cart.add(menu, toppings, jumlah, 15000 * jumlah)
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    ok, info, _ = apply_checkout(cur, cart, metode, None, waktu)
+    conn.commit()
+    assert ok, info
+    return info[0]
+
+
+class ArsipTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = connect(os.path.join(self.tmp.name, "kasir.db"))
+        migrate(self.conn)
+        self.conn.executemany(
+            "INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)",
+            [(m, "menu", 15000, 100_000) for m in MENU] + [(t, "topping", 3000, 100_000) for t in TOPPING],
+        )
+        self.conn.commit()
+        stok.compact(self.conn)
+        rng = random.Random(7)
+        hari = (SEKARANG - MULAI).days
+        for _ in range(600):
+            waktu = MULAI + datetime.timedelta(days=rng.randrange(hari), seconds=rng.randrange(86400))
+            _jual(self.conn, waktu.strftime("%Y-%m-%d %H:%M:%S"), rng.choice(MENU),
+                  rng.sample(TOPPING, rng.randrange(3)), rng.randint(1, 3), rng.choice(METODE))
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def _periode(self):
+        return {
+            "semua": (None, None),
+            "arsip": laporan.month_bounds("2026-01"),
+            "panas": laporan.month_bounds("2026-06"),
+            "lintas": ("2026-03-20 13:00:00", "2026-05-03 08:30:00"),
+        }
+
+    def _snap(self):
+        conn = self.conn
+        hasil = {"bulan": laporan.list_months(conn)}
+        for nama, (s, e) in self._periode().items():
+            hasil[nama] = (
+                laporan.summary(conn, s, e),
+                laporan.product_sales(conn, s, e),
+                laporan.sales_by_method(conn, s, e),
+                laporan.hourly_heatmap(conn, s, e),
+                laporan.daily_comparison(conn, s, e),
+                laporan.fetch_transactions(conn, s, e),
+                laporan.fetch_transactions_page(conn, s, e, limit=50),
+                b"".join(export.iter_csv(conn, s, e, chunk_size=64)),
+            )
+        return hasil
+
+    def _rollup(self):
+        return {
+            tabel: [tuple(r) for r in self.conn.execute(f"SELECT * FROM {tabel} ORDER BY 1, 2")]
+            for tabel in ("daily_sales", "daily_product_sales", "hourly_sales")
+        }
+
+    def _panas_tertua(self):
+        return self.conn.execute("SELECT MIN(waktu) FROM transaksi").fetchone()[0]
+
+    def test_laporan_sama_sesudah_arsip(self):
+        sebelum, rollup_sebelum = self._snap(), self._rollup()
+        total = self.conn.execute("SELECT COUNT(*) FROM transaksi").fetchone()[0]
+
+        hasil = arsip.jalankan(self.conn, SIMPAN_BULAN, sekarang=SEKARANG)
+        self.assertEqual(list(hasil["dipindah"]), [f"2025-{m}" for m in (10, 11, 12)] + [f"2026-0{m}" for m in range(1, 5)])
+        self.assertEqual(arsip.bulan_arsip(self.conn), list(hasil["dipindah"]))
+        self.assertEqual(arsip.batas(self.conn), "2026-05-01 00:00:00")
+        self.assertGreaterEqual(self._panas_tertua(), "2026-05-01 00:00:00")
+        ukuran = arsip.ukuran(self.conn)
+        self.assertEqual(ukuran["transaksi_panas"] + ukuran["transaksi_arsip"], total)
+        self.assertEqual(ukuran["transaksi_arsip"], sum(hasil["dipindah"].values()))
+
+        sesudah = self._snap()
+        for kunci in sebelum:
+            self.assertEqual(sesudah[kunci], sebelum[kunci], kunci)
+
+        rollup.rebuild(self.conn)
+        self.assertEqual(self._rollup(), rollup_sebelum)
+        self.assertEqual(stok.drift(self.conn), [])
+
+        # pengarsipan kedua tanpa data baru tidak memindah apa pun
+        self.assertEqual(arsip.jalankan(self.conn, SIMPAN_BULAN, sekarang=SEKARANG)["dipindah"], {})
+        self.assertEqual(self._snap(), sebelum)
+
+    def test_penjualan_terlambat_ke_bulan_arsip(self):
+        arsip.jalankan(self.conn, SIMPAN_BULAN, sekarang=SEKARANG)
+        start, end = laporan.month_bounds("2026-02")
+        ringkasan = laporan.summary(self.conn, start, end)
+        n_arsip = self.conn.execute("SELECT COUNT(*) FROM transaksi_arsip_2026_02").fetchone()[0]
+
+        # order jurnal offline yang baru tersinkron: waktu aslinya di bulan yang sudah diarsip
+        pesanan_id = _jual(self.conn, "2026-02-14 19:30:00", "Seblak Ceker", ["Telur"], 2, "Tunai")
+        self.assertLess(self._panas_tertua(), arsip.batas(self.conn))
+        self.assertIn(("transaksi_arsip_2026_02", "transaksi_item_arsip_2026_02"), arsip.partisi(self.conn, start, end))
+        self.assertEqual(arsip.partisi(self.conn, start, end)[0], ("transaksi", "transaksi_item"))
+        baru = laporan.summary(self.conn, start, end)
+        self.assertEqual(baru["jumlah_transaksi"], ringkasan["jumlah_transaksi"] + 1)
+        self.assertEqual(baru["total_terjual"], ringkasan["total_terjual"] + 2)
+        rows = laporan.fetch_transactions(self.conn, start, end)
+        self.assertIn(pesanan_id, [r["pesanan_id"] for r in rows])
+        self.assertEqual(rows, sorted(rows, key=lambda r: (r["waktu"], r["id"]), reverse=True))
+        sebelum = self._snap()
+
+        hasil = arsip.jalankan(self.conn, SIMPAN_BULAN, sekarang=SEKARANG)
+        self.assertEqual(hasil["dipindah"], {"2026-02": 1})
+        self.assertGreaterEqual(self._panas_tertua(), "2026-05-01 00:00:00")
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM transaksi_arsip_2026_02").fetchone()[0], n_arsip + 1)
+        toppings = self.conn.execute(
+            "SELECT nama FROM transaksi_item_arsip_2026_02 i JOIN transaksi_arsip_2026_02 t ON t.id = i.transaksi_id "
+            "WHERE t.pesanan_id = ? ORDER BY i.id", (pesanan_id,)
+        ).fetchall()
+        self.assertEqual([r[0] for r in toppings], ["Seblak Ceker", "Telur"])
+        self.assertEqual(self._snap(), sebelum)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+# tests/test_journal.py
+"""Pemulihan jurnal order sesudah proses kasir mati mendadak (SIGKILL).
+
+Proses anak mencatat checkout ke jurnal lalu menerapkannya lewat thread
+penulis (seperti ``service.checkout``), dan dibunuh di tengah jalan: ada
+batch yang sedang di-commit, ada entri yang sudah ter-commit tapi belum
+di-ack. Sesudah "restart" jurnal diputar ulang dan hasilnya harus tepat
+satu pesanan per entri jurnal, stok cocok, dan ledger stok tanpa selisih.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from kasir import stok
+from kasir.db import connect
+from kasir.journal import JournalSync, OrderJournal
+from kasir.schema import migrate
+from kasir.writer import WriteBehindWriter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STOK_AWAL = 100_000
+
+# argv: db, jurnal, mode ("aliran" = terus checkout; "tanpa_ack" = mati sesudah commit, sebelum ack)
+ANAK = """
+import os, signal, sys
+from kasir.cart import Cart
+from kasir.journal import OrderJournal
+from kasir.writer import WriteBehindWriter
+
+db, path, mode = sys.argv[1:4]
+journal = OrderJournal(path)
+writer = WriteBehindWriter(db, max_batch=16)
+n = 0
+while True:
+    # satu gelombang order sekaligus, supaya ada beberapa batch group commit yang sedang berjalan
+    antre = []
+    for i in range(50):
+        cart = Cart()
+        cart.add("Seblak Ceker", ["Kerupuk", "Telur"], 1 + i % 3, 20000)
+        entry = journal.append(cart, "Tunai")
+        antre.append((entry["key"], writer.submit(cart, "Tunai", entry["key"], entry["waktu"])))
+    for key, fut in antre:
+        ok, info, _ = fut.result()
+        if mode == "tanpa_ack" and n == 25:
+            os.kill(os.getpid(), signal.SIGKILL)
+        journal.resolve([(key, ok, info)])
+        n += 1
+        print(n, flush=True)
+"""
+
+
+@unittest.skipUnless(hasattr(signal, "SIGKILL"), "butuh SIGKILL (POSIX)")
+class CrashRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "kasir.db")
+        self.path = os.path.join(self.tmp.name, "jurnal.jsonl")
+        conn = connect(self.db)
+        migrate(conn)
+        conn.executemany("INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)", [
+            ("Seblak Ceker", "menu", 15000, STOK_AWAL),
+            ("Kerupuk", "topping", 3000, STOK_AWAL),
+            ("Telur", "topping", 4000, STOK_AWAL),
+        ])
+        conn.commit()
+        stok.compact(conn)
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _bunuh(self, mode, sesudah=None):
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        proc = subprocess.Popen(
+            [sys.executable, "-c", ANAK, self.db, self.path, mode],
+            stdout=subprocess.PIPE, text=True, cwd=self.tmp.name, env=env,
+        )
+        try:
+            if sesudah is not None:
+                for baris in proc.stdout:
+                    if int(baris) >= sesudah:
+                        proc.send_signal(signal.SIGKILL)
+                        break
+            proc.wait(timeout=60)
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        self.assertEqual(proc.returncode, -signal.SIGKILL)
+
+    def _restart(self):
+        journal = OrderJournal(self.path)
+        writer = WriteBehindWriter(self.db)
+        sync = JournalSync(journal, writer)
+        try:
+            applied, rejected, error = sync.drain()
+            self.assertIsNone(error)
+            self.assertEqual(rejected, 0)
+            self.diputar = applied
+            self.assertEqual(journal.pending(), [])
+        finally:
+            writer.close()
+            journal.close()
+
+    def _periksa(self, jumlah_entri):
+        conn = connect(self.db)
+        try:
+            n, unik = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT idempotency_key) FROM pesanan"
+            ).fetchone()
+            self.assertEqual(n, unik, "idempotency_key ganda")
+            self.assertEqual(n, jumlah_entri)
+            terjual = {
+                r["nama"]: r["total"] for r in conn.execute(
+                    "SELECT nama, SUM(jumlah) AS total FROM transaksi_item GROUP BY nama"
+                )
+            }
+            for r in conn.execute("SELECT nama, stok FROM produk"):
+                self.assertEqual(r["stok"], STOK_AWAL - terjual.get(r["nama"], 0), r["nama"])
+            self.assertEqual(stok.drift(conn), [])
+        finally:
+            conn.close()
+
+    def _entri(self):
+        """Jumlah entri di file jurnal (baris terakhir bisa terpotong saat proses mati)."""
+        keys = set()
+        with open(self.path, "rb") as f:
+            for raw in f:
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    continue
+                if "key" in rec:
+                    keys.add(rec["key"])
+        return len(keys)
+
+    def test_mati_di_tengah_batch(self):
+        self._bunuh("aliran", sesudah=120)
+        self._restart()
+        self.assertGreater(self.diputar, 0)
+        self._periksa(self._entri())
+
+    def test_mati_sesudah_commit_sebelum_ack(self):
+        self._bunuh("tanpa_ack")
+        conn = connect(self.db)
+        sebelum = conn.execute("SELECT COUNT(*) FROM pesanan").fetchone()[0]
+        conn.close()
+        self.assertGreater(sebelum, 0)
+        self._restart()
+        self._periksa(self._entri())
+
+    def test_restart_dua_kali_tidak_menggandakan(self):
+        self._bunuh("aliran", sesudah=110)
+        self._restart()
+        self._restart()
+        self._periksa(self._entri())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# tests/test_transaksi.py
+"""Stress test konkurensi checkout: stok tidak pernah negatif dan tidak oversell.
+
+N thread kasir berebut satu topping yang stoknya sedikit, lewat
+``checkout_cart`` (satu koneksi per thread, BEGIN IMMEDIATE) dan lewat
+``WriteBehindWriter`` (group commit). Permintaan total jauh di atas stok;
+yang terjual harus tepat ``STOK_AWAL`` porsi, stok akhir 0, tidak ada baris
+produk dengan stok < 0, dan ledger stok tetap cocok.
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from kasir import stok
+from kasir.cart import Cart
+from kasir.db import connect
+from kasir.schema import migrate
+from kasir.transaksi import checkout_cart
+from kasir.writer import WriteBehindWriter
+
+STOK_AWAL = 40
+N_KASIR = 16
+PER_KASIR = 10            # 16 x 10 order x 1-2 porsi >> 40
+
+
+class StokKonkurenTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "kasir.db")
+        conn = connect(self.db)
+        migrate(conn)
+        conn.executemany("INSERT INTO produk (nama, tipe, harga, stok) VALUES (?,?,?,?)", [
+            ("Seblak Ceker", "menu", 15000, 10_000),
+            ("Telur", "topping", 4000, STOK_AWAL),
+        ])
+        conn.commit()
+        stok.compact(conn)
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _cart(self, i):
+        cart = Cart()
+        cart.add("Seblak Ceker", ["Telur"], 1 + i % 2, 19000)
+        return cart
+
+    def _serbu(self, checkout):
+        """Jalankan ``checkout(cart)`` dari N_KASIR thread serentak; kembalikan hasil yang berhasil."""
+        mulai = threading.Barrier(N_KASIR)
+        hasil, lock, errors = [], threading.Lock(), []
+
+        def kasir(k):
+            try:
+                mulai.wait()
+                for i in range(PER_KASIR):
+                    cart = self._cart(k + i)
+                    ok, info, _ = checkout(cart)
+                    if ok:
+                        with lock:
+                            hasil.append(cart.lines[0].jumlah)
+                    else:
+                        self.assertIn("tidak mencukupi", info)
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=kasir, args=(k,)) for k in range(N_KASIR)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+        return hasil
+
+    def _periksa(self, terjual):
+        conn = connect(self.db)
+        try:
+            self.assertEqual(sum(terjual), STOK_AWAL)
+            self.assertEqual(conn.execute("SELECT stok FROM produk WHERE nama = 'Telur'").fetchone()[0], 0)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM produk WHERE stok < 0").fetchone()[0], 0)
+            di_db = conn.execute("SELECT SUM(jumlah) FROM transaksi_item WHERE nama = 'Telur'").fetchone()[0]
+            self.assertEqual(di_db, STOK_AWAL)
+            self.assertEqual(stok.drift(conn), [])
+        finally:
+            conn.close()
+
+    def test_checkout_cart_paralel(self):
+        local, conns = threading.local(), []
+
+        def checkout(cart):
+            if not hasattr(local, "conn"):
+                local.conn = connect(self.db)
+                conns.append(local.conn)
+            return checkout_cart(local.conn, cart, "Tunai")
+
+        try:
+            terjual = self._serbu(checkout)
+        finally:
+            for conn in conns:
+                conn.close()
+        self._periksa(terjual)
+
+    def test_writer_paralel(self):
+        writer = WriteBehindWriter(self.db, max_batch=8)
+        try:
+            terjual = self._serbu(lambda cart: writer.checkout(cart, "Tunai"))
+        finally:
+            writer.close()
+        self._periksa(terjual)
+
+
+if __name__ == "__main__":
+    unittest.main()